@@ -38,6 +38,18 @@ Modifications in this version:
    - ``__exit__`` always calls ``release()``.  It is therefore a bug to call ``release()`` from within a context manager.
    - Added ``locked()`` function.
    - Added blocking parameter to ``acquire()`` method
+ - Added an opt-in ``fcntl.flock`` backend (``backend='fcntl'``): waiters without a timeout block in the kernel instead of polling,
+   and the lock is dropped by the kernel when its holder dies. The lock-file backend stays the default, since the two do not exclude each other:
+   every process locking a file, including ones running older releases, must use the same backend.
+ - Added shared (reader) locks, ``read()`` / ``write()`` contexts and an optional writer preference, for the fcntl backend.
+ - FileLocks on the same path share a process-wide in-memory lock, so threads wait on a Condition instead of the filesystem,
+   only the first holder in the process locks the file, and acquisition is reentrant per thread.
+ - The lock file records the holder's pid, host, boot id and lease expiry; waiters break locks of dead holders or expired leases,
+   and holders can renew their lease, by hand or from a heartbeat thread.
+ - Added ``AsyncFileLock`` for coroutines, which waits without blocking the event loop.
+ - Added ``FileLockSet`` to hold several files at once without deadlocks.
+ - Polling waits retry with an adaptive Backoff (a short spin, then exponential sleeps with jitter, capped at ``delay``),
+   and every lock file records LockMetrics (acquisitions, wait and hold time histograms, timeouts, holders), see GetLockMetrics.
 
 WARNINGS:
  - The locking mechanism used here may need to be changed to support old NFS filesystems:
@@ -82,29 +94,869 @@ of the authors and should not be interpreted as representing official policies,
 either expressed or implied, of the FreeBSD Project.
 """
 
+import asyncio
 import errno
+import json
+import math
 import os
+import random
+import secrets
+import socket
+import threading
 import time
+import weakref
 from builtins import object, range
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager, suppress
+from typing import *
 
+try: import fcntl
+except ImportError: fcntl = None
 
 
+
+
+__all__ = [
+        'FileLockException', 'FileLock', 'AsyncFileLock', 'FileLockSet', 'BACKENDS', 'ReadOwner', 'IsStale',
+        'Backoff', 'Histogram', 'LockMetrics', 'GetLockMetrics', 'ResetLockMetrics',
+        ]
+
 class FileLockException(Exception): pass
 
+
+
+# a breaker that crashed mid-break leaves its marker behind; after this many seconds it is ignored.
+BREAK_TIMEOUT = 10.0
+
+_boot_id: Optional[str] = None
+
+def _BootID() -> Optional[str]:
+    """ changes on every boot, so a lock left by a process from before a reboot is recognized even if its pid was reused. """
+    global _boot_id
+    if _boot_id is None:
+        try:
+            with open('/proc/sys/kernel/random/boot_id') as f: _boot_id = f.read().strip()
+        except OSError: _boot_id = ''
+    return _boot_id or None
+
+def _ProcessAlive(pid: int) -> bool:
+    if os.name != 'posix': return True  # os.kill would terminate the process on Windows; only the lease applies there.
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: return True
+    return True
+
+def ReadOwner(lockfile: str) -> Optional[Dict[str, Any]]:
+    """ The record of the current holder of a lock file: pid, host, boot_id, token, acquired, expires (epoch seconds or None) and note; None if unlocked or unreadable. """
+    try:
+        with open(lockfile, 'rb') as f: data = f.read(4096)
+        record = json.loads(data)
+    except (OSError, ValueError): return None
+    return record if isinstance(record, dict) and 'pid' in record else None
+
+def IsStale(record: Optional[Dict[str, Any]]) -> bool:
+    """ A holder is gone if its lease expired, its machine rebooted, or, on this machine, its process no longer exists. """
+    if not record: return False  # unknown format: never broken automatically.
+
+    expires = record.get('expires')
+    if expires is not None and expires < time.time(): return True
+    if record.get('host') != socket.gethostname(): return False
+
+    boot_id = _BootID()
+    if boot_id and record.get('boot_id') and record['boot_id'] != boot_id: return True
+    return not _ProcessAlive(record['pid'])
+
+
+
+class Backoff(object):
+    """
+        Delays between attempts to take a lock that can only be polled (the lock-file backend, and timed waits of the fcntl backend):
+        a few immediate retries that only yield the processor, then exponentially growing sleeps capped at maximum.
+        Each sleep is shortened by a random fraction of up to jitter, so waiters that collided once do not collide again.
+    """
+    __slots__ = ['spins', 'initial', 'maximum', 'factor', 'jitter']
+    def __init__(self, *, spins: int = 3, initial: float = 0.001, maximum: float = 1.0, factor: float = 2.0, jitter: float = 0.5):
+        """
+        :param spins: attempts made right after each other before sleeping
+        :param initial: first sleep, in seconds
+        :param maximum: longest sleep, in seconds
+        :param factor: growth of the sleep after every attempt
+        :param jitter: 0 sleeps exactly, 1 sleeps anywhere between 0 and the full delay
+        """
+        self.spins = spins
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+
+    def Delays(self) -> Iterator[float]:
+        for _ in range(self.spins): yield 0.0
+
+        delay = min(self.initial, self.maximum)
+        while True:
+            yield delay * (1.0 - self.jitter * random.random())
+            delay = min(self.maximum, delay * self.factor)
+
+    def __repr__(self): return f'<{self.__class__.__name__} Object. spins: {self.spins}, initial: {self.initial}, maximum: {self.maximum}, factor: {self.factor}, jitter: {self.jitter}>'
+
+
+class Histogram(object):
+    """ Durations in power of two buckets, from 1 microsecond up to a little over an hour. """
+    BUCKETS = 33
+    __slots__ = ['Counts', 'Count', 'Sum', 'Max']
+    def __init__(self):
+        self.Counts = [0] * self.BUCKETS
+        self.Count = 0
+        self.Sum = 0.0
+        self.Max = 0.0
+
+    @staticmethod
+    def UpperBound(index: int) -> float: return 2 ** index / 1e6
+
+    def Add(self, seconds: float):
+        # frexp gives the exponent e with 2 ** (e - 1) <= microseconds < 2 ** e, so bucket e holds everything up to 2 ** e microseconds.
+        index = math.frexp(seconds * 1e6)[1] if seconds > 0 else 0
+        self.Counts[min(max(index, 0), self.BUCKETS - 1)] += 1
+        self.Count += 1
+        self.Sum += seconds
+        if seconds > self.Max: self.Max = seconds
+
+    @property
+    def Mean(self) -> float: return self.Sum / self.Count if self.Count else 0.0
+
+    def Percentile(self, percent: float) -> float:
+        """ Upper bound of the bucket holding the given percentile, which overestimates by at most a factor of two. """
+        if not self.Count: return 0.0
+
+        rank = self.Count * percent / 100
+        total = 0
+        for index, count in enumerate(self.Counts):
+            total += count
+            if total >= rank: return min(self.UpperBound(index), self.Max)
+        return self.Max
+
+    def ToDict(self) -> Dict[str, Any]:
+        return dict(Count=self.Count, Sum=self.Sum, Mean=self.Mean, Max=self.Max, p50=self.Percentile(50), p90=self.Percentile(90), p99=self.Percentile(99),
+                    Buckets={ self.UpperBound(index): count for index, count in enumerate(self.Counts) if count })
+
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Count: {self.Count}, p50: {self.Percentile(50)}, p99: {self.Percentile(99)}, Max: {self.Max}>'
+
+
+class LockMetrics(object):
+    """
+        What happened to one lock file within this process.
+
+        Acquisitions: holds granted, not counting reentrant ones
+        Contended: acquisitions that had to wait for another holder
+        Busy: non-blocking attempts that found the lock held
+        Retries: extra attempts on disk; polls of either backend, or blocking waits of the fcntl backend
+        Timeouts: waits that gave up after the timeout
+        WaitTime / HoldTime: Histograms of seconds spent waiting for, and holding, the lock
+    """
+    __slots__ = ['Path', 'Acquisitions', 'Contended', 'Busy', 'Retries', 'Timeouts', 'WaitTime', 'HoldTime', '_holders']
+    def __init__(self, Path: str):
+        self.Path = Path
+        self._holders: Dict[Hashable, Tuple[bool, float]] = { }
+        self.Reset()
+
+    def Reset(self):
+        self.Acquisitions = 0
+        self.Contended = 0
+        self.Busy = 0
+        self.Retries = 0
+        self.Timeouts = 0
+        self.WaitTime = Histogram()
+        self.HoldTime = Histogram()
+
+    def Holders(self) -> List[Dict[str, Any]]:
+        """ who in this process holds the lock now: the thread or task, whether it reads, and for how many seconds. """
+        names = { thread.ident: thread.name for thread in threading.enumerate() }
+        now = time.monotonic()
+        holders = []
+        for owner, (shared, since) in list(self._holders.items()):
+            name = f'task {owner.get_name()}' if isinstance(owner, asyncio.Task) else f'thread {names.get(owner, owner)}'
+            holders.append(dict(Owner=name, Shared=shared, Seconds=now - since))
+        return holders
+
+    def Holder(self) -> Optional[Dict[str, Any]]:
+        """ the record of the process holding the lock on disk, which may be another process; see ReadOwner. """
+        return ReadOwner(self.Path)
+
+    def ToDict(self) -> Dict[str, Any]:
+        return dict(Path=self.Path, Acquisitions=self.Acquisitions, Contended=self.Contended, Busy=self.Busy, Retries=self.Retries, Timeouts=self.Timeouts,
+                    WaitTime=self.WaitTime.ToDict(), HoldTime=self.HoldTime.ToDict(), Holders=self.Holders(), Holder=self.Holder())
+
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Path: {self.Path}, Acquisitions: {self.Acquisitions}, Contended: {self.Contended}, Timeouts: {self.Timeouts}>'
+
+
+
+class _Backend(object):
+    """ Writes and renews the holder record; lease is the number of seconds a holder claims the lock for, renewed every heartbeat seconds. """
+    def __init__(self, lockfile: str, *, delay: float, backoff: Backoff, contents: Optional[str], writer_preference: bool, lease: Optional[float], heartbeat: Optional[float]):
+        self.lockfile = lockfile
+        self.delay = delay
+        self.backoff = backoff
+        self.metrics = LockMetrics(lockfile)
+        self.contents = contents
+        self.writer_preference = writer_preference
+        self.lease = lease
+        self.heartbeat = heartbeat
+        self._state = threading.Lock()
+        self._token: Optional[str] = None
+        self._acquired = 0.0
+        self._beat: Optional[threading.Event] = None
+
+    def _Record(self, renew: bool = False) -> bytes:
+        now = time.time()
+        if not renew:
+            self._token = secrets.token_hex(8)
+            self._acquired = now
+        record = dict(pid=os.getpid(), host=socket.gethostname(), boot_id=_BootID(), token=self._token, acquired=self._acquired,
+                      expires=None if self.lease is None else now + self.lease, note=self.contents)
+        return (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+    @staticmethod
+    def _Write(fd: int, record: bytes):
+        os.pwrite(fd, record, 0)
+        os.ftruncate(fd, len(record))
+
+    def _StartHeartbeat(self):
+        if not self.heartbeat or self.lease is None: return
+
+        stop = self._beat = threading.Event()
+        def _beat():
+            while not stop.wait(self.heartbeat):
+                try: self.Renew()
+                except (OSError, FileLockException): return  # released, or the lease was lost.
+
+        threading.Thread(target=_beat, name=f'FileLock-heartbeat-{os.path.basename(self.lockfile)}', daemon=True).start()
+
+    def _StopHeartbeat(self):
+        if self._beat is not None:
+            self._beat.set()
+            self._beat = None
+
+    def Renew(self): raise NotImplementedError()
+
+    def _AfterFork(self):
+        """ a forked child holds nothing, and has no heartbeat thread. """
+        self._beat = None
+        self._token = None
+
+
+class _LockFileBackend(_Backend):
+    """
+        The original mechanism: the lock is held while the lock file exists, and waiters poll for it following the Backoff. It has no shared mode, so readers lock exclusively.
+        A waiter that finds the lock file of a dead holder, or one whose lease expired, breaks it and takes the lock on its next attempt.
+    """
+    def Acquire(self, blocking: bool, timeout: Optional[float], shared: bool) -> bool:
+        start_time = time.monotonic()
+        delays = self.backoff.Delays()
+        while True:
+            try:
+                # Attempt to create the lockfile.
+                # These flags cause os.open to raise an OSError if the file already exists.
+                fd = os.open(self.lockfile, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+                with self._state:
+                    try: self._Write(fd, self._Record())
+                    finally: os.close(fd)
+                self._StartHeartbeat()
+                return True
+            except OSError as e:
+                if e.errno != errno.EEXIST: raise
+                if self._BreakStale(): continue
+                if not blocking: return False
+                if timeout is not None and (time.monotonic() - start_time) >= timeout: raise FileLockException("Timeout occurred.")
+
+                self.metrics.Retries += 1
+                delay = next(delays)
+                time.sleep(delay if timeout is None else max(0.0, min(delay, start_time + timeout - time.monotonic())))
+
+    def _BreakStale(self) -> bool:
+        """
+            Removes the lock file if its holder is gone, and returns True if the lock should be tried again right away.
+            Breakers serialize on a marker file and move the stale file aside only if it is still the one that was judged,
+            so two waiters can never both break a lock, nor break the fresh one of a new holder.
+        """
+        try:
+            with open(self.lockfile, 'rb') as f:
+                identity = os.fstat(f.fileno())
+                record = f.read(4096)
+        except FileNotFoundError: return True
+
+        try: record = json.loads(record)
+        except ValueError: return False
+        if not isinstance(record, dict) or 'pid' not in record or not IsStale(record): return False
+
+        breaker = self.lockfile + '.break'
+        try: os.close(os.open(breaker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(breaker).st_mtime > BREAK_TIMEOUT: os.remove(breaker)
+            except FileNotFoundError: pass
+            return False
+
+        try:
+            aside = f'{self.lockfile}.{secrets.token_hex(8)}.stale'
+            try: os.rename(self.lockfile, aside)
+            except FileNotFoundError: return True
+
+            moved = os.stat(aside)
+            if (moved.st_dev, moved.st_ino) != (identity.st_dev, identity.st_ino):
+                # a new holder's file was moved instead; put it back unless yet another holder already took the name.
+                try: os.link(aside, self.lockfile)
+                except FileExistsError:
+                    # the live holder's record stays aside rather than being deleted, and this attempt backs off.
+                    return False
+            os.remove(aside)
+            return True
+        finally:
+            # a waiter may have removed the marker as expired in the meantime.
+            with suppress(FileNotFoundError): os.remove(breaker)
+
+    def _Owned(self) -> bool:
+        owner = ReadOwner(self.lockfile)
+        return owner is not None and owner.get('token') == self._token and owner.get('pid') == os.getpid()
+
+    def Release(self):
+        self._StopHeartbeat()
+        with self._state:
+            # a lock broken after its lease expired may belong to someone else by now.
+            if self._Owned(): os.remove(self.lockfile)
+            self._token = None
+
+    def Renew(self):
+        with self._state:
+            if self._token is None or not self._Owned(): raise FileLockException("The lease was lost.")
+            fd = os.open(self.lockfile, os.O_RDWR)
+            try: self._Write(fd, self._Record(renew=True))
+            finally: os.close(fd)
+
+    def Available(self, shared: bool) -> bool:
+        if not os.path.exists(self.lockfile): return True
+        return IsStale(ReadOwner(self.lockfile))
+
+    def Purge(self):
+        try: os.remove(self.lockfile)
+        except FileNotFoundError: pass
+
+
+class _FlockBackend(_Backend):
+    """
+        Holds an flock on the lock file, shared (LOCK_SH) for readers or exclusive (LOCK_EX) for writers.
+        Waiting without a timeout happens inside the kernel, which wakes a waiter the moment the lock is released; a wait with a timeout polls following the Backoff.
+        The kernel releases the lock when the holder's process dies, so no lock is ever stale; an expired lease cannot be broken, since its holder is provably still alive.
+        The lock file is left in place on release: deleting it would let a waiter that already opened the old file
+        and a newcomer that creates a new one both believe they hold the lock.
+
+        flock grants a shared lock whenever no exclusive one is held, so a steady stream of readers can starve a writer.
+        With writer_preference, a writer first takes a second "gate" file exclusively and keeps it until it holds the lock,
+        and every reader passes through the gate before locking, so readers that arrive after a waiting writer queue behind it.
+    """
+    def __init__(self, lockfile: str, **kwargs):
+        super().__init__(lockfile, **kwargs)
+        self.gatefile = lockfile + '.gate'
+        self._fd: Optional[int] = None
+
+    @staticmethod
+    def _Open(path: str) -> int: return os.open(path, os.O_CREAT | os.O_RDWR | getattr(os, 'O_CLOEXEC', 0), 0o666)
+
+    def _Lock(self, path: str, operation: int, blocking: bool, deadline: Optional[float]) -> Optional[int]:
+        """ returns a descriptor of path holding the lock, or None if it is busy and blocking is False. """
+        fd = self._Open(path)
+        try:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                fd, result = None, fd
+                return result
+            except BlockingIOError: pass
+
+            if not blocking: return None
+            self.metrics.Retries += 1
+            if deadline is None:
+                fcntl.flock(fd, operation)
+                fd, result = None, fd
+                return result
+
+            # flock has no timeout, and a helper thread blocked in it could not be abandoned without leaking it and its descriptor,
+            # so a wait with a deadline polls following the Backoff instead, sleeping no later than the deadline.
+            delays = self.backoff.Delays()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: raise FileLockException("Timeout occurred.")
+                time.sleep(min(next(delays), remaining))
+                try:
+                    fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                    fd, result = None, fd
+                    return result
+                except BlockingIOError: self.metrics.Retries += 1
+        finally:
+            if fd is not None: os.close(fd)
+
+    def Acquire(self, blocking: bool, timeout: Optional[float], shared: bool) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        gate = None
+        try:
+            if self.writer_preference:
+                gate = self._Lock(self.gatefile, fcntl.LOCK_EX, blocking, deadline)
+                if gate is None: return False
+                if shared:
+                    os.close(gate)  # readers only pass through, so they wait while a writer holds the gate.
+                    gate = None
+
+            fd = self._Lock(self.lockfile, fcntl.LOCK_SH if shared else fcntl.LOCK_EX, blocking, deadline)
+            if fd is None: return False
+        finally:
+            if gate is not None: os.close(gate)
+
+        with self._state:
+            self._fd = fd
+            # the kernel releases the lock of a dead holder, so the record is informational; readers share the file and write none.
+            if not shared: self._Write(fd, self._Record())
+        if not shared: self._StartHeartbeat()
+        return True
+
+    def Release(self):
+        self._StopHeartbeat()
+        with self._state:
+            fd, self._fd, self._token = self._fd, None, None
+            if fd is not None: os.close(fd)  # closing the descriptor drops the flock.
+
+    def _AfterFork(self):
+        # the child's copy of the descriptor shares the parent's flock and would keep it held for as long as the child lives;
+        # closing the copy leaves the parent's lock alone, where LOCK_UN would drop it for both.
+        super()._AfterFork()
+        fd, self._fd = self._fd, None
+        if fd is not None: os.close(fd)
+
+    def Renew(self):
+        with self._state:
+            if self._fd is None or self._token is None: raise FileLockException("The lock is not held exclusively.")
+            self._Write(self._fd, self._Record(renew=True))
+
+    def Available(self, shared: bool) -> bool:
+        if self._fd is not None: return False
+        try: fd = os.open(self.lockfile, os.O_RDWR)
+        except FileNotFoundError: return True
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError: return False
+        finally: os.close(fd)
+
+    def Purge(self):
+        for path in (self.lockfile, self.gatefile):
+            try: os.remove(path)
+            except FileNotFoundError: pass
+
+
+BACKENDS: Dict[str, type] = { 'lockfile': _LockFileBackend }
+if fcntl is not None: BACKENDS['fcntl'] = _FlockBackend
+
+
+
+
+def _Wake(future: asyncio.Future):
+    if not future.done(): future.set_result(None)
+
+
+class _ProcessLock(object):
+    """
+        The state of one lock file within this process, shared by every FileLock on that path.
+        Threads wait on an in-memory Condition, and tasks on futures woken alongside it, so contention inside the process never reaches the filesystem:
+        only the first holder takes the lock on disk, it is handed from thread to thread while any are waiting,
+        and it is released once the last holder leaves with nobody waiting. Holds are counted per owner, which makes them reentrant,
+        and waiting writers keep new readers out so they are not starved.
+    """
+    __slots__ = ['backend', 'metrics', 'pid', 'condition', 'futures', 'owner', 'depth', 'readers', 'waiting', 'writers_waiting', 'handoff', 'disk', 'busy', '__weakref__']
+    def __init__(self, backend):
+        self.backend = backend
+        self.metrics: LockMetrics = backend.metrics
+        self.pid = os.getpid()
+        self.condition = threading.Condition(threading.Lock())
+        self.futures: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []  # tasks waiting in memory, woken with the threads.
+        self.owner: Optional[Hashable] = None  # owner of the exclusive hold
+        self.depth = 0
+        self.readers: Dict[Hashable, int] = { }
+        self.waiting = 0
+        self.writers_waiting = 0
+        self.handoff = False  # the last holder left while threads were waiting; newcomers queue behind them instead of barging in.
+        self.disk: Optional[bool] = None  # None when unlocked on disk, otherwise whether the disk lock is shared
+        self.busy = False  # a thread is taking the disk lock.
+
+    def _CanEnter(self, shared: bool, waiter: bool) -> bool:
+        if self.busy or self.owner is not None or (self.handoff and not waiter): return False
+        if shared: return self.writers_waiting == 0
+        return not self.readers
+
+    def _Wait(self, shared: bool):
+        self.waiting += 1
+        if not shared: self.writers_waiting += 1
+
+    def _Leave(self, shared: bool):
+        self.waiting -= 1
+        if not shared: self.writers_waiting -= 1
+        self.handoff = False
+
+    def _Notify(self):
+        self.condition.notify_all()
+        futures, self.futures = self.futures, []
+        for loop, future in futures:
+            with suppress(RuntimeError): loop.call_soon_threadsafe(_Wake, future)  # the loop may be closed.
+
+    def _ReleaseIdle(self):
+        if self.disk is not None and self.owner is None and not self.readers and not self.busy and not self.waiting:
+            self.disk = None
+            self.backend.Release()
+
+    def _Granted(self, owner: Hashable, shared: bool, start: float, contended: bool):
+        now = time.monotonic()
+        if shared: self.readers[owner] = 1
+        else: self.owner, self.depth = owner, 1
+
+        metrics = self.metrics
+        metrics.Acquisitions += 1
+        if contended: metrics.Contended += 1
+        metrics.WaitTime.Add(now - start)
+        metrics._holders[owner] = shared, now
+
+    def _Released(self, owner: Hashable):
+        held = self.metrics._holders.pop(owner, None)
+        if held is not None: self.metrics.HoldTime.Add(time.monotonic() - held[1])
+
+    def _Enter(self, owner: Hashable, shared: bool, waiter: bool, start: float, contended: bool) -> Optional[bool]:
+        """
+            Called with the condition held. True if the hold was granted in memory, False if the process must wait for it,
+            and None if the lock file must be taken, in which case busy is set and the caller owes a _TakeDisk.
+        """
+        if self.owner == owner:
+            self.depth += 1  # an exclusive holder may also re-enter for reading.
+            return True
+        if owner in self.readers:
+            if not shared: raise FileLockException("Cannot upgrade a shared lock to an exclusive one; release it first.")
+            self.readers[owner] += 1
+            return True
+
+        if not self._CanEnter(shared, waiter): return False
+
+        # an exclusive disk lock covers every hold in the process; a shared one only covers readers.
+        if self.disk is False or (self.disk and shared):
+            self._Granted(owner, shared, start, contended)
+            return True
+
+        self.busy = True
+        return None
+
+    def _TakeDisk(self, owner: Hashable, shared: bool, blocking: bool, timeout: Optional[float], start: float, contended: bool, poll: bool = False) -> bool:
+        """
+            Takes the lock file while busy is set, outside the condition.
+        :param poll: one attempt of a caller that retries by itself, so a busy lock file does not count as Busy
+        """
+        locked = False
+        retries = self.metrics.Retries
+        try:
+            if self.disk:
+                # an idle shared lock a writer cannot convert in place, flock would drop it first anyway; busy keeps everyone else out meanwhile.
+                self.disk = None
+                self.backend.Release()
+            locked = self.backend.Acquire(blocking, timeout, shared)
+        except FileLockException:
+            self.metrics.Timeouts += 1
+            raise
+        finally:
+            with self.condition:
+                self.busy = False
+                if locked:
+                    self.disk = shared
+                    self._Granted(owner, shared, start, contended or self.metrics.Retries != retries)
+                elif not blocking and not poll: self.metrics.Busy += 1
+                self._Notify()
+        return locked
+
+    def Acquire(self, owner: Hashable, shared: bool, blocking: bool, timeout: Optional[float]) -> bool:
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        contended = False
+        with self.condition:
+            entered = self._Enter(owner, shared, False, start, False)
+            if entered is False:
+                if not blocking:
+                    self.metrics.Busy += 1
+                    return False
+
+                contended = True
+                self._Wait(shared)
+                try:
+                    while True:
+                        entered = self._Enter(owner, shared, True, start, True)
+                        if entered is not False: break
+
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.metrics.Timeouts += 1
+                            raise FileLockException("Timeout occurred.")
+                        self.condition.wait(remaining)
+                except BaseException:
+                    # a writer giving up may let readers in, and the disk lock may have been kept only for this waiter.
+                    self._Leave(shared)
+                    self._ReleaseIdle()
+                    self._Notify()
+                    raise
+                self._Leave(shared)
+
+            if entered: return True
+
+        return self._TakeDisk(owner, shared, blocking, None if deadline is None else max(0.0, deadline - time.monotonic()), start, contended)
+
+    async def AsyncAcquire(self, owner: Hashable, shared: bool, blocking: bool, timeout: Optional[float], executor: ThreadPoolExecutor) -> bool:
+        """
+            Acquire for coroutines. The in-process wait happens on the event loop, on a future woken with the waiting threads,
+            and the executor only runs single non-blocking attempts on the lock file, between which the task sleeps following the Backoff.
+            No thread is occupied while a task waits, so any number of tasks can wait, and each timeout starts right away.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        contended = False
+        delays: Optional[Iterator[float]] = None
+        while True:
+            waiting = False
+            future: Optional[asyncio.Future] = None
+            try:
+                while True:
+                    with self.condition:
+                        entered = self._Enter(owner, shared, waiting, start, contended)
+                        if entered is not False: break
+                        if not blocking:
+                            self.metrics.Busy += 1
+                            return False
+                        if not waiting:
+                            contended = waiting = True
+                            self._Wait(shared)
+                        future = loop.create_future()
+                        self.futures.append((loop, future))
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.metrics.Timeouts += 1
+                        raise FileLockException("Timeout occurred.")
+                    await asyncio.wait((future,), timeout=remaining)
+            except BaseException:
+                if waiting:
+                    with self.condition:
+                        self._Leave(shared)
+                        self._ReleaseIdle()
+                        self._Notify()
+                raise
+            finally:
+                if future is not None and not future.done(): future.cancel()
+
+            if waiting:
+                with self.condition: self._Leave(shared)
+            if entered: return True
+
+            # the lock file, for one attempt; a task cancelled meanwhile gives a lock granted after it stopped waiting straight back.
+            try: attempt = executor.submit(self._TakeDisk, owner, shared, False, None, start, contended, True)
+            except BaseException:
+                with self.condition:
+                    self.busy = False
+                    self._Notify()
+                raise
+
+            # shielded, since a cancelled attempt that never ran would leave busy set for good.
+            try: locked = await asyncio.shield(asyncio.wrap_future(attempt))
+            except asyncio.CancelledError:
+                attempt.add_done_callback(lambda f: not f.cancelled() and f.exception() is None and f.result() and self.Release(owner))
+                raise
+            if locked: return True
+            if not blocking:
+                self.metrics.Busy += 1
+                return False
+
+            contended = True
+            if delays is None: delays = self.backend.backoff.Delays()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self.metrics.Timeouts += 1
+                raise FileLockException("Timeout occurred.")
+            self.metrics.Retries += 1
+            delay = next(delays)
+            await asyncio.sleep(delay if remaining is None else min(delay, remaining))
+
+    def Release(self, owner: Hashable):
+        with self.condition:
+            if self.owner == owner:
+                self.depth -= 1
+                if self.depth: return
+                self.owner = None
+                self._Released(owner)
+            elif owner in self.readers:
+                self.readers[owner] -= 1
+                if self.readers[owner]: return
+                del self.readers[owner]
+                self._Released(owner)
+                if self.readers: return
+            else: raise FileLockException("The lock is not held by this owner.")
+
+            self._ReleaseIdle()  # kept for the next thread if any are waiting.
+            self.handoff = self.waiting > 0
+            self._Notify()
+
+    def Available(self, shared: bool) -> bool:
+        with self.condition:
+            if self.busy or self.owner is not None: return False
+            if self.readers: return shared and self.writers_waiting == 0
+            if self.disk is not None: return True
+        return self.backend.Available(shared)
+
+
+_registry: MutableMapping[str, _ProcessLock] = weakref.WeakValueDictionary()
+_registry_lock = threading.Lock()
+# metrics outlive the FileLocks that produced them, so a lock used now and then still reports its whole history;
+# those of lock files no longer in use are kept for the RETAINED_METRICS most recently used ones.
+RETAINED_METRICS = 256
+_retained: 'OrderedDict[str, LockMetrics]' = OrderedDict()
+_retiring: Deque[Tuple[str, LockMetrics]] = deque()
+
+def _Retire(key: str, metrics: LockMetrics, pid: int):
+    # a finalizer may run while this thread holds _registry_lock, so it only queues the metrics.
+    if pid == os.getpid(): _retiring.append((key, metrics))
+
+def _Retained() -> 'OrderedDict[str, LockMetrics]':
+    """ called with _registry_lock held. """
+    while _retiring:
+        key, metrics = _retiring.popleft()
+        if key in _registry: continue
+        _retained[key] = metrics
+        _retained.move_to_end(key)
+    while len(_retained) > RETAINED_METRICS: _retained.popitem(last=False)
+    return _retained
+
+def _ResetAfterFork():
+    """ a forked child starts with an empty registry: the parent's holds, waiters and locks are not the child's. """
+    global _registry, _registry_lock, _retained, _retiring
+    for entry in list(_registry.values()): entry.backend._AfterFork()
+    _registry = weakref.WeakValueDictionary()
+    _registry_lock = threading.Lock()  # another thread may have held it at the moment of the fork.
+    _retained = OrderedDict()
+    _retiring = deque()
+
+if hasattr(os, 'register_at_fork'): os.register_at_fork(after_in_child=_ResetAfterFork)
+
+def _ProcessLockFor(lockfile: str, backend: str, factory: Callable[[], Any]) -> _ProcessLock:
+    """
+        one _ProcessLock per resolved lock file path, for as long as some FileLock uses it; a forked child starts with its own.
+        Every FileLock on a path must use the same backend, since the lock-file and fcntl backends do not exclude each other.
+    """
+    key = os.path.realpath(lockfile)
+    with _registry_lock:
+        retained = _Retained()
+        entry = _registry.get(key)
+        if entry is not None and entry.pid == os.getpid() and type(entry.backend) is not BACKENDS[backend]:
+            current = next(name for name, cls in BACKENDS.items() if cls is type(entry.backend))
+            raise ValueError(f'"{lockfile}" is already locked with the "{current}" backend in this process, it cannot also use "{backend}"')
+        if entry is None or entry.pid != os.getpid():
+            backend = factory()
+            metrics = retained.pop(key, None)
+            if metrics is not None: backend.metrics = metrics
+            entry = _registry[key] = _ProcessLock(backend)
+            weakref.finalize(entry, _Retire, key, backend.metrics, os.getpid())
+        return entry
+
+def GetLockMetrics(path: str = None) -> Union[Optional[LockMetrics], Dict[str, LockMetrics]]:
+    """
+        Metrics of every lock file in use in this process, and of the RETAINED_METRICS most recently used others, keyed by resolved lock file path;
+        or those of one lock, given the protected file or its lock file, None if it is unknown.
+    """
+    with _registry_lock:
+        metrics = dict(_Retained())
+        metrics.update((key, entry.metrics) for key, entry in list(_registry.items()))
+    if path is None: return metrics
+    return metrics.get(os.path.realpath(path + '.lock')) or metrics.get(os.path.realpath(path))
+
+def ResetLockMetrics():
+    with _registry_lock:
+        for metrics in list(_Retained().values()) + [entry.metrics for entry in list(_registry.values())]: metrics.Reset()
+
+
+
+
+# acquire() without a timeout uses the constructor's; an explicit None waits forever.
+_UNSET: Any = object()
+
+
 class FileLock(object):
     """
     A file locking mechanism that has context-manager support so you can use it in a ``with`` statement.
-    This should be relatively cross compatible as it doesn't rely on ``msvcrt`` or ``fcntl`` for the locking.
+    Uses the cross compatible lock-file mechanism, which doesn't rely on ``msvcrt`` or ``fcntl``, unless ``backend='fcntl'`` selects ``fcntl.flock``.
+    The two backends do not exclude each other, so every process locking a file, including ones running older releases, must use the same one.
+
+    With the fcntl backend, readers can share the lock while writers get it exclusively:
+
+        lock = FileLock(path, backend='fcntl', writer_preference=True)
+        with lock.read(): ...
+        with lock.write(): ...
+
+    All FileLocks on the same path within a process share one in-memory lock in front of the file, and are reentrant per thread.
 
     Based on https://github.com/ilastik/lazyflow/blob/master/lazyflow/utility/fileLock.py
     """
-    def __init__(self, protected_file_path: str, *, timeout: float = None, delay: float = 1, lock_file_contents: str = 'lock_file_contents'):
-        """ Prepare the file locker. Specify the file to lock and optionally the maximum timeout and the delay between each attempt to lock. """
-        self._is_locked = False
+    def __init__(self, protected_file_path: str, *, timeout: float = None, delay: float = 1, lock_file_contents: str = None, backend: str = None,
+                 shared: bool = False, writer_preference: bool = False, lease: float = None, heartbeat: float = None, backoff: Backoff = None):
+        """
+        Prepare the file locker. Specify the file to lock and optionally the maximum timeout and the delay between each attempt to lock.
+
+        :param delay: longest sleep between attempts; the fcntl backend only polls while waiting with a timeout
+        :param backend: 'lockfile' (the default) or 'fcntl', where available; all processes locking the file must agree on it
+        :param shared: acquire() and ``with`` take a shared (read) lock by default; the lock-file backend locks readers exclusively
+        :param writer_preference: new readers wait behind a waiting writer; only effective if every process locking the file enables it
+        :param lock_file_contents: note stored in the holder record, next to the pid, host, boot id and lease expiry
+        :param lease: seconds the holder claims the lock for; waiters using the lock-file backend break a lock whose lease expired, None never expires
+        :param heartbeat: renew the lease every this many seconds while the lock is held; should be well below lease
+        :param backoff: retry policy of polling waits, defaults to Backoff(maximum=delay)
+        """
+        self._holds: List[Hashable] = []
         self.lockfile = protected_file_path + ".lock"
         self.timeout = timeout
         self.delay = delay
         self._lock_file_contents = lock_file_contents
+        self.shared = shared
+        self.writer_preference = writer_preference
+        self._is_shared = False
+        if backend is None: backend = 'lockfile'
+        if backend not in BACKENDS: raise ValueError(f'Unknown backend "{backend}", expected one of {tuple(BACKENDS)}')
+        self.backend = backend
+        lockfile = self.lockfile  # the factory must not refer to self, or every FileLock would live until a garbage collection.
+        # the first FileLock on a path in this process decides the backend settings for all of them; a different backend raises ValueError.
+        self._factory = lambda: BACKENDS[backend](lockfile, delay=delay, backoff=backoff or Backoff(maximum=delay), contents=lock_file_contents, writer_preference=writer_preference, lease=lease, heartbeat=heartbeat)
+        self._pid = os.getpid()
+        self._entry = _ProcessLockFor(self.lockfile, backend, self._factory)
+
+    @property
+    def _process_lock(self) -> _ProcessLock:
+        """ a FileLock inherited through fork holds nothing in the child, and joins the child's own registry. """
+        if self._pid != os.getpid():
+            self._holds = []
+            self._is_shared = False
+            self._entry = _ProcessLockFor(self.lockfile, self.backend, self._factory)
+            self._pid = os.getpid()
+        return self._entry
+
+    @property
+    def _is_locked(self) -> bool:
+        if self._pid != os.getpid(): return False
+        return bool(self._holds)
+
+    @staticmethod
+    def _Owner() -> Hashable:
+        """ holds are reentrant per owner: the thread for FileLock. """
+        return threading.get_ident()
+
+    @property
+    def metrics(self) -> LockMetrics:
+        """ Metrics of this lock file in this process, shared by all FileLocks on the same path. """
+        return self._process_lock.metrics
 
     def locked(self):
         """
@@ -113,38 +965,63 @@ class FileLock(object):
         """
         return self._is_locked
 
-    def available(self):
-        """ Returns True iff the file is currently available to be locked. """
-        return not os.path.exists(self.lockfile)
+    def locked_shared(self):
+        """ Returns True iff THIS FileLock instance holds the file with a shared (read) lock. """
+        return self._is_locked and self._is_shared
 
-    def acquire(self, blocking=True):
+    def available(self, shared: bool = False):
+        """ Returns True iff the file is currently available to be locked, exclusively or, if shared, for reading. """
+        return self._process_lock.Available(shared)
+
+    def acquire(self, blocking=True, shared: bool = None, timeout: Optional[float] = _UNSET):
         """
         Acquire the lock, if possible. If the lock is in use, and `blocking` is False, return False.
-        Otherwise, check again every `self.delay` seconds until it either gets the lock or exceeds `timeout` number of seconds, in which case it raises an exception.
-        """
-        start_time = time.time()
-        while True:
-            try:
-                # Attempt to create the lockfile.
-                # These flags cause os.open to raise an OSError if the file already exists.
-                fd = os.open(self.lockfile, os.O_CREAT | os.O_EXCL | os.O_RDWR)
-                with os.fdopen(fd, "a") as f:
-                    # Print some info about the current process as debug info for anyone who bothers to look.
-                    f.write(self._lock_file_contents)
-                break
-            except OSError as e:
-                if e.errno != errno.EEXIST: raise
-                if self.timeout is not None and (time.time() - start_time) >= self.timeout: raise FileLockException("Timeout occurred.")
-                if not blocking: return False
+        Otherwise, wait until it either gets the lock or exceeds `timeout` number of seconds, in which case it raises an exception.
+        A thread that already holds the lock, through any FileLock on the same path, acquires it again immediately.
 
-                time.sleep(self.delay)
-        self._is_locked = True
+        :param shared: take a shared (read) lock instead of an exclusive one; defaults to the mode given to the constructor
+        :param timeout: overrides the timeout given to the constructor for this call; None waits forever
+        """
+        if shared is None: shared = self.shared
+        if timeout is _UNSET: timeout = self.timeout
+        owner = self._Owner()
+        if not self._process_lock.Acquire(owner, shared, blocking, timeout): return False
+        self._holds.append(owner)
+        self._is_shared = shared
         return True
 
     def release(self):
-        """ Get rid of the lock by deleting the lockfile. When working in a `with` statement, this gets automatically called at the end. """
-        self._is_locked = False
-        os.remove(self.lockfile)
+        """ Release the lock. When working in a `with` statement, this gets automatically called at the end. """
+        # a lock may be released by another thread than the one that acquired it; the current thread's own hold goes first.
+        process_lock = self._process_lock
+        owner = self._Owner()
+        if owner in self._holds: self._holds.remove(owner)
+        elif self._holds: owner = self._holds.pop()
+        else: raise FileLockException("The lock is not held by this FileLock.")
+        process_lock.Release(owner)
+
+    def renew(self):
+        """ Extends the lease of the held lock by another lease seconds from now; raises FileLockException if it was lost to a waiter. """
+        if not self._is_locked: raise FileLockException("The lock is not held by this FileLock.")
+        self._process_lock.backend.Renew()
+
+    def owner(self) -> Optional[Dict[str, Any]]:
+        """ The holder record in the lock file, see ReadOwner. """
+        return ReadOwner(self.lockfile)
+
+    @contextmanager
+    def read(self):
+        """ Holds a shared lock for the duration of the block. """
+        self.acquire(shared=True)
+        try: yield self
+        finally: self.release()
+
+    @contextmanager
+    def write(self):
+        """ Holds an exclusive lock for the duration of the block. """
+        self.acquire(shared=False)
+        try: yield self
+        finally: self.release()
 
     def __enter__(self):
         """ Activated when used in the with statement. Should automatically acquire a lock to be used in the with block. """
@@ -156,18 +1033,171 @@ class FileLock(object):
         self.release()
 
     def __del__(self):
-        """ Make sure this ``FileLock`` instance doesn't leave a .lock file lying around. """
-        if self._is_locked:
+        """ Make sure this ``FileLock`` instance doesn't leave the file locked. """
+        if getattr(self, '_pid', None) != os.getpid(): return  # the holds belong to the parent process.
+        while getattr(self, '_holds', None):
             self.release()
 
     def purge(self):
         """ For debug purposes only.  Removes the lock file from the hard disk. """
         if os.path.exists(self.lockfile):
-            self.release()
+            process_lock = self._process_lock
+            while self._holds: self.release()
+            process_lock.backend.Purge()
             return True
         return False
 
 
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _AsyncExecutor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None: _executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix='AsyncFileLock')
+    return _executor
+
+
+class AsyncFileLock(FileLock):
+    """
+    FileLock for coroutines, sharing the same process-wide registry, backends and semantics, with holds reentrant per task instead of per thread.
+    Waiting for other holders in the process happens on the event loop, and a lock file held by another process is polled following the Backoff.
+    Only the single attempts on the lock file, including breaking a stale one, run on a thread pool, so the loop never blocks on a syscall
+    and no thread is occupied while a task waits. A cancelled wait gives the lock straight back if it was granted after the task stopped waiting.
+
+        lock = AsyncFileLock(path, timeout=5)
+        async with lock: ...
+        async with lock.read(): ...
+    """
+    def __init__(self, protected_file_path: str, *, executor: ThreadPoolExecutor = None, **kwargs):
+        """
+        :param executor: pool the attempts on the lock file run on; defaults to a shared pool of 64 threads
+        :param kwargs: see FileLock
+        """
+        super().__init__(protected_file_path, **kwargs)
+        self._executor = executor
+
+    @staticmethod
+    def _Owner() -> Hashable:
+        try: return asyncio.current_task() or threading.get_ident()
+        except RuntimeError: return threading.get_ident()  # no running loop, for example release() from __del__.
+
+    async def acquire(self, blocking=True, shared: bool = None, timeout: Optional[float] = _UNSET):
+        """
+        Acquire the lock, if possible. If the lock is in use, and `blocking` is False, return False.
+        Otherwise, wait until it either gets the lock or exceeds `timeout` number of seconds, in which case it raises an exception.
+
+        :param shared: take a shared (read) lock instead of an exclusive one; defaults to the mode given to the constructor
+        :param timeout: overrides the timeout given to the constructor for this call; None waits forever
+        """
+        if shared is None: shared = self.shared
+        if timeout is _UNSET: timeout = self.timeout
+        owner = self._Owner()
+        if not await self._process_lock.AsyncAcquire(owner, shared, blocking, timeout, self._executor or _AsyncExecutor()): return False
+        self._holds.append(owner)
+        self._is_shared = shared
+        return True
+
+    @asynccontextmanager
+    async def read(self):
+        """ Holds a shared lock for the duration of the block. """
+        await self.acquire(shared=True)
+        try: yield self
+        finally: self.release()
+
+    @asynccontextmanager
+    async def write(self):
+        """ Holds an exclusive lock for the duration of the block. """
+        await self.acquire(shared=False)
+        try: yield self
+        finally: self.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, type, value, traceback): self.release()
+
+    def __enter__(self): raise TypeError("AsyncFileLock is used with 'async with'")
+    def __exit__(self, type, value, traceback): pass
+
+
+class FileLockSet(object):
+    """
+    Holds the locks of several files at once. Locks are always taken in one canonical order, sorted by resolved lock file path,
+    and released in reverse, so two sets that overlap can never deadlock. A failed or timed out acquisition releases whatever it took.
+
+        with FileLockSet([first, second, third], timeout=10): ...
+    """
+    def __init__(self, protected_file_paths: Iterable[str], *, timeout: float = None, shared: bool = False, **kwargs):
+        """
+        :param protected_file_paths: files to lock; duplicates, including different spellings of one path, are locked once
+        :param timeout: seconds the whole set may take to acquire, shared by all of its locks
+        :param shared: lock every file for reading
+        :param kwargs: passed to each FileLock
+        """
+        locks: Dict[str, FileLock] = { }
+        for path in protected_file_paths:
+            key = os.path.realpath(path + ".lock")
+            if key not in locks: locks[key] = FileLock(path, shared=shared, **kwargs)
+
+        self.locks: List[FileLock] = [locks[key] for key in sorted(locks)]
+        self.timeout = timeout
+        self.shared = shared
+        self._held: List[FileLock] = []
+        self._locked = False  # tracked on its own, since an empty set holds no FileLock.
+
+    def locked(self):
+        """ Returns True iff THIS FileLockSet holds all of its locks. """
+        return self._locked
+
+    def acquire(self, blocking=True, timeout: Optional[float] = _UNSET):
+        """
+        Acquire every lock, in canonical order. If `blocking` is False, either all of them are taken or none, and False is returned if any is in use.
+        Otherwise, wait until all are held or `timeout` seconds have passed in total, in which case the taken ones are released and an exception is raised.
+
+        :param timeout: overrides the timeout given to the constructor for this call; None waits forever
+        """
+        if timeout is _UNSET: timeout = self.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        taken: List[FileLock] = []
+        try:
+            for lock in self.locks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: raise FileLockException("Timeout occurred.")
+                if not lock.acquire(blocking, self.shared, remaining):
+                    self._Release(taken)
+                    return False
+                taken.append(lock)
+        except BaseException:
+            self._Release(taken)
+            raise
+
+        self._held = taken
+        self._locked = True
+        return True
+
+    @staticmethod
+    def _Release(taken: List[FileLock]):
+        for lock in reversed(taken): lock.release()
+
+    def release(self):
+        """ Release every lock, in reverse order. """
+        held, self._held, self._locked = self._held, [], False
+        self._Release(held)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, type, value, traceback): self.release()
+
+    def __len__(self): return len(self.locks)
+    def __iter__(self) -> Iterator[FileLock]: return iter(self.locks)
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Locks: {len(self.locks)}, Held: {self._locked}>'
+
+
 if __name__ == "__main__":
     import sys
     import functools
@@ -201,7 +1231,7 @@ if __name__ == "__main__":
     th3.join()
     th4.join()
 
-    assert (not os.path.exists(fl.lockfile), "The lock file wasn't cleaned up!")
+    assert fl.available(), "The lock wasn't released!"
 
     # Print the contents of the file.
     # Please manually inspect the output.  Does it look like the operations were atomic?
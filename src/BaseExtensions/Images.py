@@ -11,6 +11,7 @@ from .Exceptions import ArgumentError
 from .Models.Files import *
 from .Models.Json import *
 from .Models.Postitions import *
+from .Models.Temporary import *
 
 
 
@@ -139,7 +140,7 @@ class ImageObject(object):
         except AttributeError:
             self._name_ = f'{hash(self)}.{extension.value}'
             return self._name_
-    def _TempFilePath(self, extension: ImageExtensions) -> Path: return Path.CreateTemporaryFile(self.__name__(extension), self.__module__, root_dir=tempfile.gettempdir())
+    def _TempFilePath(self, extension: ImageExtensions, arena: TempArena = None) -> Path: return Path.CreateTemporaryFile(self.__name__(extension), self.__module__, root_dir=tempfile.gettempdir(), arena=arena)
     def __enter__(self):
         self._fp = open(self._path, 'wb')
         self._img = Image.open(self._fp)
@@ -153,7 +154,7 @@ class ImageObject(object):
             self._img.close()
             self._fp.close()
             self._fp = None
-    def __call__(self, *, path: Union[str, Path] = None, extension: ImageExtensions = None):
+    def __call__(self, *, path: Union[str, Path] = None, extension: ImageExtensions = None, arena: TempArena = None):
         if not path and not extension:
             raise ArgumentError('Must Provide either the file path or the image type extension')
 
@@ -162,7 +163,7 @@ class ImageObject(object):
             if hasattr(self, '_temp'): del self._temp
             return self
 
-        self._temp = self._TempFilePath(extension)
+        self._temp = self._TempFilePath(extension, arena)
         return self
     def save(self): self._img.save(self._fp)
 
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import *
+
+
+
+
+__all__ = [
+        'AsyncFileExecutor', 'GetAsyncExecutor', 'SetAsyncExecutor',
+        ]
+
+_T = TypeVar("_T")
+
+
+
+class AsyncFileExecutor(object):
+    """
+        Runs blocking file operations for coroutines on a bounded thread pool.
+        At most max_concurrent operations per event loop are submitted at once; further callers wait on a semaphore
+        inside the loop, so a burst of requests cannot pile thousands of blocking calls into the pool's queue.
+    """
+    def __init__(self, max_workers: int = None, max_concurrent: int = None, *, thread_name_prefix: str = 'AsyncFile'):
+        """
+        :param max_workers: threads in the pool, defaults to min(32, cpu count + 4)
+        :param max_concurrent: operations submitted at once per event loop, defaults to max_workers
+        """
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.max_concurrent = max_concurrent or self.max_workers
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=thread_name_prefix)
+        self._semaphores: MutableMapping[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+    def _Semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None: semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return semaphore
+
+    async def Run(self, func: Callable[..., _T], *args, **kwargs) -> _T:
+        """
+            Awaits func(*args, **kwargs) on the pool.
+            If the awaiting task is cancelled the call still finishes in its thread, and keeps its slot until it does.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._Semaphore(loop)
+        await semaphore.acquire()
+        try: future: Future = self._pool.submit(func, *args, **kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def _release(_):
+            try: loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError: pass  # the loop is already closed.
+
+        future.add_done_callback(_release)
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def Shutdown(self, wait: bool = True): self._pool.shutdown(wait=wait)
+
+    def __enter__(self): return self
+    def __exit__(self, *args): self.Shutdown()
+    def __repr__(self): return f'<{self.__class__.__name__} Object. max_workers: {self.max_workers}, max_concurrent: {self.max_concurrent}>'
+
+
+
+_default: Optional[AsyncFileExecutor] = None
+_default_lock = threading.Lock()
+
+def GetAsyncExecutor() -> AsyncFileExecutor:
+    """ The process-wide executor used by the Path.Async* methods, created on first use. """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None: _default = AsyncFileExecutor()
+    return _default
+
+def SetAsyncExecutor(executor: AsyncFileExecutor, *, shutdown_previous: bool = True):
+    """ Replaces the process-wide executor, for example with AsyncFileExecutor(max_workers=4, max_concurrent=16). """
+    global _default
+    with _default_lock:
+        previous, _default = _default, executor
+
+    if shutdown_previous and previous is not None and previous is not executor: previous.Shutdown(wait=False)
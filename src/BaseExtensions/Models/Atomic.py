@@ -0,0 +1,120 @@
+import io
+import os
+import secrets
+import threading
+from typing import *
+
+
+
+
+__all__ = [
+        'AtomicWrite', 'GroupCommit', 'FsyncDirectory',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+
+
+
+def FsyncDirectory(path: _AnyPath):
+    """ Makes the creation, rename or removal of entries in the directory durable. A no-op where directories cannot be opened (Windows). """
+    if os.name != 'posix': return
+    fd = os.open(path, os.O_RDONLY)
+    try: os.fsync(fd)
+    finally: os.close(fd)
+
+
+
+class GroupCommit(object):
+    """
+        Coalesces the directory fsyncs of many atomic writes.
+        Each AtomicWrite still fsyncs its own data before the rename, but the parent directory is only fsynced once per Commit,
+        no matter how many files were replaced in it. The renames are durable once Commit returns.
+
+            with GroupCommit() as group:
+                for path, data in items: path.SaveJson(data, group=group)
+    """
+    def __init__(self, *, max_pending: int = None):
+        """
+        :param max_pending: if set, Commit automatically once this many writes are waiting
+        """
+        self._lock = threading.Lock()
+        self._directories: Set[str] = set()
+        self._pending = 0
+        self.max_pending = max_pending
+
+    @property
+    def Pending(self) -> int: return self._pending
+
+    def Add(self, directory: _AnyPath):
+        with self._lock:
+            self._directories.add(os.fspath(directory))
+            self._pending += 1
+            full = self.max_pending is not None and self._pending >= self.max_pending
+
+        if full: self.Commit()
+
+    def Commit(self):
+        with self._lock:
+            directories, self._directories = self._directories, set()
+            self._pending = 0
+
+        for directory in directories: FsyncDirectory(directory)
+
+    def __enter__(self): return self
+    def __exit__(self, *args): self.Commit()
+
+
+
+class AtomicWrite(object):
+    """
+        Opens a temporary file next to the target and, on a clean exit, fsyncs it, renames it over the target with os.replace and fsyncs the directory.
+        Readers therefore see either the old or the new contents, never a truncated file. On an exception the temporary file is removed and the target is left untouched.
+
+            with AtomicWrite(path, 'w') as f: f.write(text)
+    """
+    def __init__(self, path: _AnyPath, mode: str = 'wb', *, group: GroupCommit = None, buffering: int = -1, encoding: str = None, errors: str = None, newline: str = None):
+        if 'r' in mode or 'a' in mode or '+' in mode: raise ValueError(f'AtomicWrite only supports write modes, got "{mode}"')
+
+        self._path = os.path.abspath(path)
+        self._directory = os.path.dirname(self._path)
+        self._mode = mode.replace('x', 'w')
+        self._group = group
+        self._kwargs = dict(buffering=buffering) if 'b' in mode else dict(buffering=buffering, encoding=encoding, errors=errors, newline=newline)
+        self._temp: Optional[str] = None
+        self._fp: Optional[IO] = None
+
+    def __enter__(self) -> IO:
+        self._temp = os.path.join(self._directory, f'.{os.path.basename(self._path)}.{secrets.token_hex(4)}.tmp')
+        # created through os.open so the umask applies exactly as it would to a plain open(path, 'w').
+        fd = os.open(self._temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            try: os.chmod(fd, os.stat(self._path).st_mode & 0o7777)
+            except (FileNotFoundError, NotImplementedError, TypeError): pass
+
+            self._fp = io.open(fd, self._mode, **self._kwargs)
+        except BaseException:
+            os.close(fd)
+            os.remove(self._temp)
+            raise
+
+        return self._fp
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        fp, self._fp = self._fp, None
+        committed = exc_type is None
+        try:
+            if committed:
+                fp.flush()
+                os.fsync(fp.fileno())
+        except BaseException:
+            committed = False
+            raise
+        finally:
+            fp.close()
+            if not committed: os.remove(self._temp)
+
+        if exc_type is not None: return
+
+        os.replace(self._temp, self._path)
+        if self._group is not None: self._group.Add(self._directory)
+        else: FsyncDirectory(self._directory)
@@ -0,0 +1,163 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from types import MappingProxyType
+from typing import *
+
+from ..sizes import sizeof
+
+
+
+
+__all__ = [
+        'FileCache', 'CacheCopies', 'CacheWeight',
+        'GetFileCache', 'SetFileCache',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+_T = TypeVar("_T")
+_Stamp = Tuple[int, int, int]
+
+
+
+class CacheCopies(str, Enum):
+    """ what a cache hit returns. """
+    Deep = 'deep'  # a copy.deepcopy of the cached object; safe to mutate, costs a copy per hit.
+    ReadOnly = 'readonly'  # the cached object frozen once at load time: dicts become mappingproxy, lists tuples, sets frozensets.
+                           # models lose their type along with their mutability, so read models with Deep or Shared.
+    Shared = 'shared'  # the cached object itself; callers must not mutate it.
+
+class CacheWeight(str, Enum):
+    """ how an entry is charged against max_bytes. """
+    SizeOf = 'sizeof'  # sizes.sizeof of the loaded object.
+    File = 'file'  # size of the file on disk.
+
+
+def _Freeze(o: Any) -> Any:
+    """ dict, list and set subclasses, models included, are frozen to the plain read-only types. """
+    if isinstance(o, dict): return MappingProxyType({ key: _Freeze(value) for key, value in o.items() })
+    if isinstance(o, (list, tuple)): return tuple(_Freeze(item) for item in o)
+    if isinstance(o, (set, frozenset)): return frozenset(o)
+    return o
+
+
+
+class _Entry(object):
+    __slots__ = ['stamp', 'value', 'weight']
+    def __init__(self, stamp: _Stamp, value: Any, weight: int):
+        self.stamp = stamp
+        self.value = value
+        self.weight = weight
+
+
+class FileCache(object):
+    """
+        Read-through cache for parsed files, validated against each file's (mtime_ns, size, inode) on every lookup,
+        so an edited or replaced file is reloaded on its next read. Entries are evicted least recently used first
+        once their combined weight exceeds max_bytes.
+    """
+    # a file modified within this window could change again without its mtime moving, so it is not cached.
+    RACY_WINDOW_NS = 2_000_000_000
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, *, copies: CacheCopies = CacheCopies.Deep, weight: CacheWeight = CacheWeight.SizeOf):
+        self.max_bytes = max_bytes
+        self.copies = CacheCopies(copies)
+        self.weight = CacheWeight(weight)
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def Hits(self) -> int: return self._hits
+    @property
+    def Misses(self) -> int: return self._misses
+    @property
+    def Evictions(self) -> int: return self._evictions
+    @property
+    def Bytes(self) -> int: return self._bytes
+    @property
+    def Count(self) -> int: return len(self._entries)
+    def Stats(self) -> Dict[str, int]: return dict(Hits=self._hits, Misses=self._misses, Evictions=self._evictions, Bytes=self._bytes, Count=len(self._entries))
+
+    def Get(self, path: _AnyPath, key: Hashable, loader: Callable[[], _T]) -> _T:
+        """
+        :param path: file the value is parsed from
+        :param key: identifies how it was parsed, for example the reader and its arguments
+        :param loader: parses the file; only called on a miss
+        """
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        full_key = (os.path.abspath(path), key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(full_key)
+                self._hits += 1
+                value = entry.value
+            else:
+                self._misses += 1
+                value = entry = None
+
+        if entry is not None: return copy.deepcopy(value) if self.copies == CacheCopies.Deep else value
+
+        value = loader()
+        stored = _Freeze(value) if self.copies == CacheCopies.ReadOnly else value
+        if time.time_ns() - st.st_mtime_ns < self.RACY_WINDOW_NS: return stored  # not cached, but shaped like a hit.
+
+        self._Store(full_key, _Entry(stamp, stored, st.st_size if self.weight == CacheWeight.File else sizeof(value)))
+        return copy.deepcopy(value) if self.copies == CacheCopies.Deep else stored
+
+    def _Store(self, key: Hashable, entry: _Entry):
+        if entry.weight > self.max_bytes: return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None: self._bytes -= previous.weight
+
+            self._entries[key] = entry
+            self._bytes += entry.weight
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.weight
+                self._evictions += 1
+
+    def Invalidate(self, path: _AnyPath = None):
+        """ Drops every entry for the given file, or everything if no path is given. """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+
+            path = os.path.abspath(path)
+            for key in [key for key in self._entries if key[0] == path]: self._bytes -= self._entries.pop(key).weight
+
+    def ResetCounters(self):
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __repr__(self): return f'<{self.__class__.__name__} Object. {self.Stats()}>'
+
+
+
+_default: Optional[FileCache] = None
+_default_lock = threading.Lock()
+
+def GetFileCache() -> FileCache:
+    """ The process-wide cache used by Path.ReadJson / ReadPickle / GetFileData when called with cache=True, created on first use. """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None: _default = FileCache()
+    return _default
+
+def SetFileCache(cache: FileCache):
+    """ Replaces the process-wide cache, for example with FileCache(max_bytes=256 * 1024 * 1024, copies=CacheCopies.ReadOnly). """
+    global _default
+    with _default_lock: _default = cache
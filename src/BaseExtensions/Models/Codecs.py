@@ -0,0 +1,98 @@
+import bz2
+import functools
+import gzip
+import lzma
+import os
+from typing import *
+
+
+
+
+__all__ = [
+        'Codec', 'CODECS', 'CODEC_ERRORS', 'BadBz2File',
+        'GetCodec', 'CodecFromExtension', 'DetectCodec',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+
+
+
+class Codec(object):
+    """ A stdlib streaming compressor. Open wraps an already open binary file object and never closes it. """
+    __slots__ = ['Name', 'Extensions', 'Magic', 'Levels', 'DefaultLevel', '_open']
+    def __init__(self, Name: str, Extensions: Tuple[str, ...], Magic: bytes, Levels: range, DefaultLevel: int, _open: Callable[[BinaryIO, str, int], BinaryIO]):
+        self.Name = Name
+        self.Extensions = Extensions
+        self.Magic = Magic
+        self.Levels = Levels
+        self.DefaultLevel = DefaultLevel
+        self._open = _open
+
+    def Open(self, fileobj: BinaryIO, mode: str, level: int = None) -> BinaryIO:
+        """
+        :param fileobj: open binary file
+        :param mode: 'rb' or 'wb'
+        :param level: compression level, ignored when reading; defaults to DefaultLevel
+        """
+        if level is None: level = self.DefaultLevel
+        if level not in self.Levels: raise ValueError(f'{self.Name} level must be in {self.Levels}, got {level}')
+        return self._open(fileobj, mode, level)
+
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Name: {self.Name}>'
+
+
+
+class BadBz2File(OSError):
+    """ A corrupt bz2 stream; bz2 itself raises a bare OSError, which cannot be told apart from a real I/O error. """
+
+def _Bz2Errors(method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        try: return method(self, *args)
+        except BadBz2File: raise
+        except OSError as e:
+            if e.errno is None: raise BadBz2File(*e.args) from e  # I/O errors carry an errno, decompression errors do not.
+            raise
+    return wrapper
+
+class _Bz2File(bz2.BZ2File):
+    read = _Bz2Errors(bz2.BZ2File.read)
+    read1 = _Bz2Errors(bz2.BZ2File.read1)
+    readinto = _Bz2Errors(bz2.BZ2File.readinto)
+    readline = _Bz2Errors(bz2.BZ2File.readline)
+    readlines = _Bz2Errors(bz2.BZ2File.readlines)
+    peek = _Bz2Errors(bz2.BZ2File.peek)
+    seek = _Bz2Errors(bz2.BZ2File.seek)
+
+
+
+# mtime=0 keeps gzip output byte-identical for identical input.
+GZIP = Codec('gzip', ('.gz', '.gzip'), b'\x1f\x8b', range(0, 10), 6, lambda f, mode, level: gzip.GzipFile(fileobj=f, mode=mode, compresslevel=level, mtime=0))
+BZ2 = Codec('bz2', ('.bz2',), b'BZh', range(1, 10), 9, lambda f, mode, level: _Bz2File(f, mode, compresslevel=level))
+LZMA = Codec('lzma', ('.xz', '.lzma'), b'\xfd7zXZ\x00', range(0, 10), 6, lambda f, mode, level: lzma.LZMAFile(f, mode, preset=level if 'w' in mode else None))
+
+CODECS: Dict[str, Codec] = { codec.Name: codec for codec in (GZIP, BZ2, LZMA) }
+
+# what a truncated or corrupt compressed stream raises while being read.
+CODEC_ERRORS = (EOFError, gzip.BadGzipFile, BadBz2File, lzma.LZMAError)
+
+
+
+def GetCodec(codec: Union[str, Codec, None]) -> Optional[Codec]:
+    """ Accepts a Codec, one of its names ('gzip', 'bz2', 'lzma'), or None / 'raw' for no compression. """
+    if codec is None or isinstance(codec, Codec): return codec
+    if codec == 'raw': return None
+    try: return CODECS[codec]
+    except KeyError: raise ValueError(f'Unknown codec "{codec}", expected one of {tuple(CODECS)} or "raw"') from None
+
+def CodecFromExtension(path: _AnyPath) -> Optional[Codec]:
+    extension = os.path.splitext(os.fspath(path))[1].lower()
+    for codec in CODECS.values():
+        if extension in codec.Extensions: return codec
+    return None
+
+def DetectCodec(header: bytes) -> Optional[Codec]:
+    """ Identifies the codec from the first bytes of a file; None means uncompressed. """
+    for codec in CODECS.values():
+        if header.startswith(codec.Magic): return codec
+    return None
@@ -0,0 +1,148 @@
+import errno
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import *
+
+from ..Constants import PlatformIsLinux
+
+try: import fcntl
+except ImportError: fcntl = None
+
+
+
+
+__all__ = [
+        'CopyFile', 'CopyTree',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+
+# ioctl request number of FICLONE on Linux; shares the source extents with the destination (btrfs, xfs, ...).
+FICLONE = 0x40049409
+
+# errors meaning "this mechanism cannot be used for this pair of files", as opposed to a real I/O failure.
+_UNSUPPORTED = { errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.ENOTSOCK }
+
+
+
+def _Reflink(src: int, dst: int, size: int, offset: int) -> int:
+    if offset or not size or fcntl is None or not PlatformIsLinux: return offset
+    try: fcntl.ioctl(dst, FICLONE, src)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED: return offset
+        raise
+    return size
+
+def _CopyFileRange(src: int, dst: int, size: int, offset: int) -> int:
+    if not hasattr(os, 'copy_file_range'): return offset
+    while offset < size:
+        try: n = os.copy_file_range(src, dst, size - offset, offset, offset)
+        except OSError as e:
+            if e.errno in _UNSUPPORTED: return offset
+            raise
+        if not n: break
+        offset += n
+    return offset
+
+def _SendFile(src: int, dst: int, size: int, offset: int) -> int:
+    if not PlatformIsLinux or not hasattr(os, 'sendfile'): return offset  # only Linux accepts a regular file as the destination.
+    os.lseek(dst, offset, os.SEEK_SET)
+    while offset < size:
+        try: n = os.sendfile(dst, src, offset, size - offset)
+        except OSError as e:
+            if e.errno in _UNSUPPORTED: return offset
+            raise
+        if not n: break
+        offset += n
+    return offset
+
+def _ReadInto(src: int, dst: int, offset: int, BlockSize: int) -> int:
+    """ last resort, and the only stage that keeps going past the size seen at open time. """
+    os.lseek(src, offset, os.SEEK_SET)
+    os.lseek(dst, offset, os.SEEK_SET)
+    buf = bytearray(BlockSize)
+    view = memoryview(buf)
+    with open(src, 'rb', buffering=0, closefd=False) as f:
+        n = f.readinto(buf)
+        while n:
+            written = 0
+            while written < n: written += os.write(dst, view[written:n])
+            offset += n
+            n = f.readinto(buf)
+    return offset
+
+
+def CopyFile(src: _AnyPath, dst: _AnyPath, *, preserve_metadata: bool = False, BlockSize: int = 1 << 20) -> int:
+    """
+        Byte-exact copy that keeps the data inside the kernel whenever possible.
+        Tries, in order: a FICLONE reflink, os.copy_file_range, os.sendfile, then a readinto loop over one reused buffer.
+        Each stage resumes from wherever the previous one stopped.
+
+    :param src: file to copy
+    :param dst: destination file, truncated if it exists
+    :param preserve_metadata: also copy permission bits, timestamps and flags (see shutil.copystat)
+    :param BlockSize: buffer size of the final fallback
+    :return: number of bytes copied
+    """
+    with open(src, 'rb', buffering=0) as _in, open(dst, 'wb', buffering=0) as out:
+        src_fd, dst_fd = _in.fileno(), out.fileno()
+        size = os.fstat(src_fd).st_size
+        if hasattr(os, 'posix_fadvise'):
+            try: os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError: pass
+
+        offset = _Reflink(src_fd, dst_fd, size, 0)
+        if offset < size: offset = _CopyFileRange(src_fd, dst_fd, size, offset)
+        if offset < size: offset = _SendFile(src_fd, dst_fd, size, offset)
+        offset = _ReadInto(src_fd, dst_fd, offset, BlockSize)
+
+    if preserve_metadata: shutil.copystat(src, dst)
+    return offset
+
+
+def CopyTree(src: _AnyPath, dst: _AnyPath, *, workers: int = None, preserve_metadata: bool = False, symlinks: bool = False, exist_ok: bool = False, BlockSize: int = 1 << 20) -> int:
+    """
+        Recreates the directory structure of src under dst, then copies the files concurrently with CopyFile.
+        The copy syscalls release the GIL, so the thread pool overlaps the I/O of many files.
+
+    :param src: directory to copy
+    :param dst: destination directory
+    :param workers: thread count, defaults to the ThreadPoolExecutor default
+    :param preserve_metadata: passed to CopyFile, and applied to the directories as well
+    :param symlinks: if True, symbolic links are recreated as links instead of having their targets copied
+    :param exist_ok: if False, raise FileExistsError when dst already exists
+    :param BlockSize: buffer size of CopyFile's final fallback
+    :return: total number of bytes copied
+    """
+    os.makedirs(dst, exist_ok=exist_ok)
+    directories: List[Tuple[str, str]] = [(os.fspath(src), os.fspath(dst))]
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for root, dirs, files in os.walk(src, followlinks=not symlinks):
+            target = os.path.join(dst, os.path.relpath(root, src))
+            for name in dirs:
+                source, destination = os.path.join(root, name), os.path.join(target, name)
+                if symlinks and os.path.islink(source):
+                    os.symlink(os.readlink(source), destination)
+                    continue
+
+                os.makedirs(destination, exist_ok=True)
+                directories.append((source, destination))
+
+            for name in files:
+                source, destination = os.path.join(root, name), os.path.join(target, name)
+                if symlinks and os.path.islink(source):
+                    os.symlink(os.readlink(source), destination)
+                    continue
+
+                futures.append(executor.submit(CopyFile, source, destination, preserve_metadata=preserve_metadata, BlockSize=BlockSize))
+
+        for future in futures: total += future.result()
+
+    # directory timestamps change while their contents are written, so they are restored last.
+    if preserve_metadata:
+        for source, destination in reversed(directories): shutil.copystat(source, destination)
+
+    return total
@@ -1,41 +1,210 @@
-import base64
-import hashlib
+import errno
+import io
 import json
+import mmap
 import os
 import pickle
+import stat
+import sys
 import tempfile
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from os.path import *
 from pathlib import Path as _Path
 from typing import *
 
+from .Asynchronous import *
+from .Atomic import *
+from .Caching import *
+from .Codecs import *
+from .Copying import CopyFile as _CopyFile, CopyTree as _CopyTree
+from .Hashing import *
+from .Json import BaseModel, serialize as _serialize
+from .OutOfBand import DumpOutOfBand, LoadOutOfBand, ReadBuffers, ReadHeader, SidecarName, WriteBuffers, WriteHeader
+from .Walking import *
+from .Watching import *
+
 
 
 
 __all__ = [
-        'Path'
+        'Path', 'FileStat', 'MemoryMapping',
         ]
 
-class FileData(Protocol[bytes]):
+class FileData(Protocol):
     def load(self, f: BinaryIO) -> Any: ...
     def dump(self, data: bytes, f: BinaryIO) -> Any: ...
 
-class Path(os.PathLike):
-    def __init__(self, _path: str, temporary_file: bool = False):
-        self._temporary_file = temporary_file
+class FileStat(object):
+    """ Snapshot of a path's metadata, taken with one lstat (plus one stat for a symbolic link); every property is answered without another syscall. """
+    __slots__ = ['_path', '_lstat', '_stat']
+    def __init__(self, _path: str, _lstat: Optional[os.stat_result], _stat: Optional[os.stat_result]):
         self._path = _path
+        self._lstat = _lstat
+        self._stat = _stat
+
+    @classmethod
+    def Load(cls, _path: Union[str, os.PathLike]) -> 'FileStat':
+        try: _lstat = os.lstat(_path)
+        except (OSError, ValueError): return cls(os.fspath(_path), None, None)
+
+        if not stat.S_ISLNK(_lstat.st_mode): return cls(os.fspath(_path), _lstat, _lstat)
+
+        try: return cls(os.fspath(_path), _lstat, os.stat(_path))
+        except (OSError, ValueError): return cls(os.fspath(_path), _lstat, None)  # broken link
+
+    @classmethod
+    def FromDirEntry(cls, entry: os.DirEntry) -> 'FileStat':
+        """ Reuses the stat data DirEntry already cached, so entries from Path.Scan cost at most one more syscall. """
+        try: _lstat = entry.stat(follow_symlinks=False)
+        except OSError: return cls(entry.path, None, None)
 
+        if not entry.is_symlink(): return cls(entry.path, _lstat, _lstat)
+
+        try: return cls(entry.path, _lstat, entry.stat())
+        except OSError: return cls(entry.path, _lstat, None)
+
+    @property
+    def Exists(self) -> bool: return self._stat is not None
+    @property
+    def IsFile(self) -> bool: return self._stat is not None and stat.S_ISREG(self._stat.st_mode)
+    @property
+    def IsDirectory(self) -> bool: return self._stat is not None and stat.S_ISDIR(self._stat.st_mode)
+    @property
+    def IsLink(self) -> bool: return self._lstat is not None and stat.S_ISLNK(self._lstat.st_mode)
+    @property
+    def Size(self) -> int: return self.Raw.st_size
     @property
-    def Exists(self) -> bool: return exists(self._path)
+    def ModifiedTime(self) -> int: return self.Raw.st_mtime_ns
+    @property
+    def Raw(self) -> os.stat_result:
+        """ The stat result of the target (symbolic links followed). Raises FileNotFoundError if it does not exist. """
+        if self._stat is None: raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self._path)
+        return self._stat
+
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Location: "{self._path}", Exists: {self.Exists}>'
+
+
+
+class MemoryMapping(object):
+    """
+        Context manager over a memory mapped range of a file. Entering yields a memoryview of exactly [offset, offset + length),
+        so slicing it never copies. Views derived from it must be released before the block exits.
+    """
+    __slots__ = ['_path', '_offset', '_length', '_writable', '_mmap', '_view']
+    def __init__(self, _path: Union[str, os.PathLike], offset: int = 0, length: int = None, writable: bool = False):
+        if offset < 0: raise ValueError('offset must not be negative')
+        self._path = _path
+        self._offset = offset
+        self._length = length
+        self._writable = writable
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
 
     @property
-    def IsFile(self) -> bool: return isfile(self._path)
+    def Map(self) -> Optional[mmap.mmap]: return self._mmap
+
+    def __enter__(self) -> memoryview:
+        with open(self._path, 'r+b' if self._writable else 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            length = size - self._offset if self._length is None else min(self._length, size - self._offset)
+            if length <= 0:
+                self._view = memoryview(bytearray() if self._writable else b'')
+                return self._view
+
+            # mmap offsets must be a multiple of the allocation granularity, so map from the boundary below and slice the difference off.
+            start = self._offset - self._offset % mmap.ALLOCATIONGRANULARITY
+            delta = self._offset - start
+            self._mmap = mmap.mmap(f.fileno(), length + delta, access=mmap.ACCESS_WRITE if self._writable else mmap.ACCESS_READ, offset=start)
+
+        self._view = memoryview(self._mmap)[delta:delta + length]
+        return self._view
+
+    def __exit__(self, *args):
+        if self._view is not None: self._view.release()
+        if self._mmap is not None:
+            if self._writable: self._mmap.flush()
+            self._mmap.close()
+        self._view = self._mmap = None
+
+
+
+class _StatCache(object):
+    __slots__ = ['ttl', 'snapshot', 'time']
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.snapshot: Optional[FileStat] = None
+        self.time = 0.0
+
+
+def _RemoveTemporaryFile(_path: str):
+    try: os.remove(_path)
+    except FileNotFoundError: pass
+
+
+
+class Path(object):
+    """
+        Compact path object: slot based, and only temporary files carry a finalizer.
+        It is still an os.PathLike, through __fspath__.
+    """
+    __slots__ = ['_raw', '_lazy', '_stat_cache', '__weakref__']
+    def __init__(self, _path: str, temporary_file: bool = False, *, stat_ttl: float = None, intern: bool = False, lazy: bool = False):
+        """
+        :param _path: location
+        :param temporary_file: remove the file when this object is garbage collected, or at interpreter exit
+        :param stat_ttl: if set, Exists / IsFile / IsDirectory / IsLink / Size are answered from one cached FileStat for this many seconds
+        :param intern: intern the path string, so many objects for the same location share one string
+        :param lazy: store the path as given and absolutize it on first use, against the working directory at that time
+        """
+        if intern: _path = sys.intern(_path)
+        self._raw = _path
+        self._lazy = lazy and not isabs(_path)
+        self._stat_cache = _StatCache(stat_ttl) if stat_ttl is not None else None
+        if temporary_file: weakref.finalize(self, _RemoveTemporaryFile, self._path)
+
     @property
-    def IsDirectory(self) -> bool: return isdir(self._path)
+    def _path(self) -> str:
+        if self._lazy:
+            self._raw = abspath(self._raw)
+            self._lazy = False
+        return self._raw
+
+    def Stat(self) -> FileStat:
+        """ Returns the cached snapshot while it is younger than stat_ttl, otherwise takes a new one. """
+        cache = self._stat_cache
+        if cache is not None and cache.snapshot is not None and time.monotonic() - cache.time < cache.ttl: return cache.snapshot
+        return self.Refresh()
+    def Refresh(self) -> FileStat:
+        """ Takes a new snapshot, and keeps it if this object was created with stat_ttl. """
+        snapshot = FileStat.Load(self._path)
+        cache = self._stat_cache
+        if cache is not None:
+            cache.snapshot = snapshot
+            cache.time = time.monotonic()
+        return snapshot
+    def _Invalidate(self):
+        if self._stat_cache is not None: self._stat_cache.snapshot = None
+
     @property
-    def IsLink(self) -> bool: return islink(self._path)
+    def Exists(self) -> bool: return self.Stat().Exists if self._stat_cache is not None else exists(self._path)
 
-    def rename(self, new: str): return os.rename(self._path, join(self.BaseName, new))
-    def Remove(self): return os.remove(self._path)
+    @property
+    def IsFile(self) -> bool: return self.Stat().IsFile if self._stat_cache is not None else isfile(self._path)
+    @property
+    def IsDirectory(self) -> bool: return self.Stat().IsDirectory if self._stat_cache is not None else isdir(self._path)
+    @property
+    def IsLink(self) -> bool: return self.Stat().IsLink if self._stat_cache is not None else islink(self._path)
+
+    def rename(self, new: str):
+        self._Invalidate()
+        return os.rename(self._path, join(self.BaseName, new))
+    def Remove(self):
+        self._Invalidate()
+        return os.remove(self._path)
 
     def chmod(self, mode: int, dir_fd=None, follow_symlinks: bool = False) -> None:
         """
@@ -61,6 +230,7 @@ class Path(os.PathLike):
         dir_fd and follow_symlinks may not be implemented on your platform.
           If they are unavailable, using them will raise a NotImplementedError.
         """
+        self._Invalidate()
         return os.chmod(self._path, mode, dir_fd=dir_fd, follow_symlinks=follow_symlinks)
 
     @property
@@ -98,29 +268,69 @@ class Path(os.PathLike):
     def DirectoryName(self) -> str: return dirname(self._path)
 
     @property
-    def Size(self) -> int: return getsize(self._path)
+    def Size(self) -> int: return self.Stat().Size if self._stat_cache is not None else getsize(self._path)
     def ToUri(self): return _Path(self._path).as_uri()
 
 
-    def GetHashID(self, BlockSize: int = 65536) -> str:
+    def GetHashID(self, BlockSize: int = 65536, algorithm: str = 'sha1', *, cache: DigestCache = None) -> str:
         """
         :param BlockSize: defaults to 64KB
+        :param algorithm: any name accepted by hashlib.new, defaults to sha1
+        :param cache: optional DigestCache; an unchanged file is answered from it without being read
         :return:
         """
         if self.IsDirectory: raise IsADirectoryError('Argument cannot be a directory.')
 
-        _hasher = hashlib.sha1()
-        with open(self, 'rb') as f:
-            buf = f.read(BlockSize)
-            while len(buf) > 0:
-                _hasher.update(buf)
-                buf = f.read(BlockSize)
-        return base64.urlsafe_b64encode(_hasher.digest()).decode()
+        if cache is not None: return cache.Get(self._path, algorithm, BlockSize)
+        return HashFile(self._path, algorithm, BlockSize)
+
+    @classmethod
+    def StatMany(cls, paths: Iterable[Union[str, 'Path']], *, workers: int = None) -> Iterator[Tuple['Path', FileStat]]:
+        """
+            Takes a FileStat of every path on a thread pool, yielding (Path, FileStat) pairs in input order.
+            Each Path keeps its snapshot, so a Path created with stat_ttl answers its properties from it.
+            At most a few stats per worker are in flight at once, so ``paths`` may be a lazy iterable of any length.
+        """
+        items = (item if isinstance(item, Path) else cls.FromString(item) for item in paths)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            limit = executor._max_workers * 4
+            pending: Deque[Tuple[Path, Future]] = deque()
+            try:
+                for item in items:
+                    pending.append((item, executor.submit(item.Refresh)))
+                    if len(pending) >= limit:
+                        item, future = pending.popleft()
+                        yield item, future.result()
+
+                while pending:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            finally:
+                for _, future in pending: future.cancel()
+
+    @classmethod
+    def HashMany(cls, paths: Iterable[Union[str, 'Path']], algorithm: str = 'sha1', *, workers: int = None, BlockSize: int = 65536, return_exceptions: bool = False, cache: DigestCache = None) -> Iterator[Tuple['Path', Union[str, BaseException]]]:
+        """
+            Hashes many files concurrently, yielding (Path, digest) pairs as each one completes.
+            Directories are expanded recursively.
+
+        :param paths: files and/or directories
+        :param algorithm: any name accepted by hashlib.new, defaults to sha1
+        :param workers: thread count, defaults to the ThreadPoolExecutor default
+        :param BlockSize: defaults to 64KB
+        :param return_exceptions: if True, a failure is yielded as (Path, exception) instead of being raised
+        :param cache: optional DigestCache consulted before reading each file
+        :return:
+        """
+        def _files() -> Iterator[Path]:
+            for item in paths:
+                if isdir(item): yield from cls.Walk(item)
+                else: yield item if isinstance(item, Path) else cls.FromString(item)
+
+        return HashFiles(_files(), algorithm, workers=workers, BlockSize=BlockSize, return_exceptions=return_exceptions, cache=cache)
 
 
 
-    def __del__(self):
-        if self._temporary_file and self.Exists: return self.Remove()
     def __str__(self): return self._path
     def __repr__(self):
         try: return f'<{self.__class__.__qualname__} Object. Location: "{self._path}">'
@@ -137,63 +347,298 @@ class Path(os.PathLike):
         if not isinstance(other, Path): return NotImplementedError()
         return self._path != other._path
 
-    def __hash__(self):
-        try:
-            return self._hash
-        except AttributeError:
-            self._hash = hash(self._path)
-            return self._hash
+    def __hash__(self): return hash(self._path)  # str caches its own hash.
 
     @property
     def Value(self): return self._path
 
 
-    def GetFileData(self, file: FileData, *, Default=None, Check: callable = None, RemoveOnError: bool = False):
-        try:
-            with open(self, 'rb') as f:
+    def GetFileData(self, file: FileData, *, Default=None, Check: callable = None, RemoveOnError: bool = False, codec: Union[str, Codec] = None, cache: Union[bool, FileCache] = None):
+        """ :param cache: True for the process-wide FileCache, or a FileCache; unchanged files are then returned without being parsed again """
+        def _load():
+            with self._OpenForReading(True, codec) as f:
                 dat = file.load(f)
                 if callable(Check): Check(dat)
                 return dat
+
+        try: return self._ReadThrough(cache, ('data', file, Check, codec), _load)
         except FileNotFoundError: return Default
-        except (pickle.PickleError, pickle.PicklingError, json.JSONDecodeError):
+        except (pickle.PickleError, pickle.PicklingError, json.JSONDecodeError) + CODEC_ERRORS:
             if RemoveOnError: self.Remove()
             return Default
-    def SetFileData(self, data: Any, file: FileData, *, Check: callable = None):
-            with open(self, 'wb') as f:
+    def SetFileData(self, data: Any, file: FileData, *, Check: callable = None, atomic: bool = False, group: GroupCommit = None, codec: Union[str, Codec] = None, level: int = None):
+            with self._OpenCompressed(True, atomic, group, codec, level) as f:
                 if callable(Check): data = Check(data)
                 file.dump(data, f)
 
 
-    def SaveJson(self, data: Union[List, Dict], **kwargs):
-        with open(self, 'w') as f:
+    def _OpenForWriting(self, mode: str, atomic: bool, group: Optional[GroupCommit], **kwargs) -> ContextManager[IO]:
+        """ Passing a GroupCommit implies an atomic write. """
+        self._Invalidate()
+        if atomic or group is not None: return AtomicWrite(self._path, mode, group=group, **kwargs)
+        return open(self._path, mode, **kwargs)
+
+    @contextmanager
+    def _OpenCompressed(self, binary: bool, atomic: bool, group: Optional[GroupCommit], codec: Union[str, Codec, None], level: Optional[int]) -> Iterator[IO]:
+        """ codec None selects one from the extension (.gz, .bz2, .xz); 'raw' never compresses. Compressed text is always utf-8. """
+        _codec = CodecFromExtension(self._path) if codec is None else GetCodec(codec)
+        if _codec is None:
+            with self._OpenForWriting('wb' if binary else 'w', atomic, group) as f: yield f
+            return
+
+        with self._OpenForWriting('wb', atomic, group) as raw, _codec.Open(raw, 'wb', level) as f:
+            if binary:
+                yield f
+                return
+
+            text = io.TextIOWrapper(f, encoding='utf-8')
+            try: yield text
+            finally:
+                text.flush()
+                text.detach()
+
+    @contextmanager
+    def _OpenForReading(self, binary: bool, codec: Union[str, Codec, None]) -> Iterator[IO]:
+        """ codec None detects the compression from the file's magic bytes. """
+        with open(self, 'rb') as raw:
+            _codec = DetectCodec(raw.peek(8)[:8]) if codec is None else GetCodec(codec)
+            if _codec is None and binary:
+                yield raw
+                return
+
+            with (_codec.Open(raw, 'rb') if _codec is not None else raw) as f:
+                if binary:
+                    yield f
+                    return
+
+                text = io.TextIOWrapper(f, encoding='utf-8' if _codec is not None else None)
+                try: yield text
+                finally: text.detach()
+
+
+    def SaveJson(self, data: Union[List, Dict], *, atomic: bool = False, group: GroupCommit = None, codec: Union[str, Codec] = None, level: int = None, **kwargs):
+        """
+        :param codec: 'gzip', 'bz2', 'lzma', a Codec, or 'raw'; defaults to the one matching the file extension
+        :param level: compression level of the codec
+        """
+        with self._OpenCompressed(False, atomic, group, codec, level) as f:
             return json.dump(data, f, **kwargs)
-    def ReadJson(self, **kwargs) -> Union[List, Dict]:
-        with open(self, 'r') as f:
-            return json.load(f, **kwargs)
+    def SaveModel(self, model: BaseModel, *, atomic: bool = True, group: GroupCommit = None, codec: Union[str, Codec] = None, level: int = None, chunk_size: int = 64 * 1024, compact: bool = False) -> int:
+        """
+            Streams model.WriteJson into the file, by default through a temporary file renamed over this path,
+            so readers see either the previous file or the complete new one.
+
+        :param atomic: replace the file atomically; False writes in place
+        :param group: GroupCommit that batches the directory fsyncs of many atomic writes; implies atomic
+        :param codec: 'gzip', 'bz2', 'lzma', a Codec, or 'raw'; defaults to the one matching the file extension
+        :param level: compression level of the codec
+        :return: number of characters written
+        """
+        with self._OpenCompressed(True, atomic, group, codec, level) as f:
+            return model.WriteJson(f, chunk_size=chunk_size, compact=compact)
+    def ReadJson(self, *, codec: Union[str, Codec] = None, cache: Union[bool, FileCache] = None, **kwargs) -> Union[List, Dict]:
+        """
+        :param codec: forces a codec; by default compressed files are recognized from their magic bytes
+        :param cache: True for the process-wide FileCache, or a FileCache; unchanged files are then returned without being parsed again
+        """
+        def _load():
+            with self._OpenForReading(False, codec) as f:
+                return json.load(f, **kwargs)
 
+        return self._ReadThrough(cache, ('json', codec, tuple(sorted(kwargs.items()))), _load)
 
-    def SavePickle(self, data: Any, **kwargs):
-        with open(self, 'wb') as f:
-            return pickle.dump(data, f, **kwargs)
-    def ReadPickle(self, **kwargs) -> Any:
-        with open(self, 'rb') as f:
-            return pickle.load(f, **kwargs)
 
+    def IterJsonLines(self, model: Type = None, *, encoding: str = 'utf-8', **kwargs) -> Iterator[Any]:
+        """
+            Streams a JSON Lines file one record at a time; blank lines are skipped.
+
+        :param model: optional BaseModel subclass; each record is passed through model.Parse
+        :param kwargs: passed to json.loads
+        """
+        with open(self, 'r', encoding=encoding) as f:
+            for line in f:
+                if not line.strip(): continue
+                record = json.loads(line, **kwargs)
+                yield model.Parse(record) if model is not None else record
+    def AppendJsonLines(self, records: Iterable[Any], *, flush_every: int = 1000, encoding: str = 'utf-8', **kwargs) -> int:
+        """
+            Appends records as JSON Lines without reading or rewriting the existing ones.
+            Lines are written in batches of flush_every records, so memory stays bounded for any number of records.
+
+        :param records: json serializable objects or models
+        :param flush_every: records buffered per write
+        :param kwargs: passed to json.dumps; indent is not allowed since every record must stay on one line
+        :return: number of records written
+        """
+        if kwargs.get('indent') is not None: raise ValueError('JSON Lines records cannot be indented')
+        kwargs.setdefault('default', _serialize)
+        kwargs.setdefault('separators', (',', ':'))
+
+        self._Invalidate()
+        count = 0
+        batch: List[str] = []
+        with open(self, 'a', encoding=encoding, newline='\n') as f:
+            for record in records:
+                batch.append(json.dumps(record, **kwargs))
+                if len(batch) >= flush_every:
+                    batch.append('')
+                    f.write('\n'.join(batch))
+                    f.flush()
+                    count += len(batch) - 1
+                    batch.clear()
+
+            if batch:
+                batch.append('')
+                f.write('\n'.join(batch))
+                count += len(batch) - 1
+
+        return count
+
+
+    def SavePickle(self, data: Any, *, atomic: bool = False, group: GroupCommit = None, codec: Union[str, Codec] = None, level: int = None, out_of_band: bool = False, **kwargs):
+        """
+        :param codec: 'gzip', 'bz2', 'lzma', a Codec, or 'raw'; defaults to the one matching the file extension
+        :param level: compression level of the codec
+        :param out_of_band: pickle with protocol 5 and write large buffers (bytes, bytearray, PickleBuffer-aware arrays) raw to a sidecar file
+                            next to this one, from which ReadPickle memory maps them instead of copying them through the pickle stream
+        """
+        # a plain save over an out of band pickle must also drop the sidecar the old contents referred to.
+        previous = self._GetSidecar()
+        if not out_of_band:
+            name = None
+            with self._OpenCompressed(True, atomic, group, codec, level) as f:
+                pickle.dump(data, f, **kwargs)
+
+        else:
+            if kwargs.setdefault('protocol', 5) < 5: raise ValueError('out of band buffers require pickle protocol 5 or higher')
+
+            buffers: List[Tuple[Any, int]] = []
+            payload = DumpOutOfBand(data, buffers, **kwargs)
+
+            # the new sidecar is complete before the file referencing it is replaced, and the old one is only removed afterwards.
+            name = SidecarName(basename(self._path))
+            with AtomicWrite(join(dirname(self._path), name), 'wb', group=group) if atomic or group is not None else open(join(dirname(self._path), name), 'wb') as f:
+                index = WriteBuffers(f, buffers)
+
+            with self._OpenCompressed(True, atomic, group, codec, level) as f:
+                WriteHeader(f, name, index)
+                f.write(payload)
+
+        if previous and previous != name:
+            try: os.remove(join(dirname(self._path), previous))
+            except FileNotFoundError: pass
+    def ReadPickle(self, *, codec: Union[str, Codec] = None, writable_buffers: bool = False, buffer_views: bool = False, cache: Union[bool, FileCache] = None, **kwargs) -> Any:
+        """
+        :param codec: forces a codec; by default compressed files are recognized from their magic bytes
+        :param writable_buffers: for out of band pickles, map the sidecar copy-on-write so the loaded buffers are mutable
+        :param buffer_views: for out of band pickles, return large bytes and bytearray values as memoryviews of the sidecar mapping;
+                             by default they are copied out of it, and only PickleBuffer-aware objects are loaded without a copy
+        :param cache: True for the process-wide FileCache, or a FileCache; unchanged files are then returned without being parsed again
+        """
+        def _load():
+            with self._OpenForReading(True, codec) as f:
+                header = ReadHeader(f)
+                if header is None: return pickle.load(f, **kwargs)
+
+                name, index = header
+                return LoadOutOfBand(f, ReadBuffers(join(dirname(self._path), name), index, writable_buffers), index, as_views=buffer_views, **kwargs)
+
+        return self._ReadThrough(cache, ('pickle', codec, writable_buffers, buffer_views, tuple(sorted(kwargs.items()))), _load)
+    def _ReadThrough(self, cache: Union[bool, FileCache, None], key: Hashable, loader: Callable[[], Any]) -> Any:
+        """ reads are only cached when the reader's arguments are hashable, since they are part of the key. """
+        if not cache: return loader()
+        if cache is True: cache = GetFileCache()
+        try: hash(key)
+        except TypeError: return loader()
+        return cache.Get(self._path, key, loader)
+    def _GetSidecar(self) -> Optional[str]:
+        """ name of the buffer file the current contents refer to, if any; only the header is read, nothing is unpickled. """
+        try:
+            with self._OpenForReading(True, None) as f: header = ReadHeader(f)
+        except Exception: return None
+        return header[0] if header is not None else None
+
+
+    def Write(self, content: Union[str, bytes] = None, *, buffering=None, encoding: str = None, errors=None, newline: str = '\n', closefd=True, atomic: bool = False, group: GroupCommit = None):
+        """
+        :param atomic: write to a temporary file and rename it over this path, so a crash never leaves a truncated file
+        :param group: GroupCommit that batches the directory fsyncs of many atomic writes; implies atomic
+        """
+        if buffering is None: buffering = -1
 
-    def Write(self, content: Union[str, bytes] = None, *, buffering=None, encoding: str = None, errors=None, newline: str = '\n', closefd=True):
         if isinstance(content, str):
-            with open(self, 'w', buffering, encoding, errors, newline, closefd) as f:
+            with self._OpenForWriting('w', atomic, group, buffering=buffering, encoding=encoding, errors=errors, newline=newline) as f:
                 f.write(content)
 
         elif isinstance(content, bytes):
-            with open(self, 'wb', buffering, encoding, errors, newline, closefd) as f:
+            with self._OpenForWriting('wb', atomic, group, buffering=buffering) as f:
                 f.write(content)
-    def Read(self, open_as_binary: bool = False):
-        with open(self, 'rb' if open_as_binary else 'r') as f:
-            f.read()
+    def Read(self, open_as_binary: bool = False) -> Union[str, bytes]:
+        if open_as_binary:
+            with open(self, 'rb', buffering=0) as f:  # unbuffered FileIO sizes one allocation from fstat.
+                return f.read()
+
+        with open(self, 'r') as f:
+            return f.read()
+
+    def ReadInto(self, buffer: Union[bytearray, memoryview, mmap.mmap], offset: int = 0) -> int:
+        """
+            Fills a caller owned writable buffer from the file, starting at offset, without an intermediate bytes object.
+
+        :return: number of bytes read; less than len(buffer) only at end of file
+        """
+        view = memoryview(buffer).cast('B')
+        total = 0
+        with open(self, 'rb', buffering=0) as f:
+            if offset: f.seek(offset)
+            while total < len(view):
+                n = f.readinto(view[total:])
+                if not n: break
+                total += n
+
+        return total
+
+    def MemoryMap(self, offset: int = 0, length: int = None, writable: bool = False) -> MemoryMapping:
+        """
+                with path.MemoryMap(offset, length) as view:
+                    header = view[:16]
+
+        :param offset: first byte to map
+        :param length: number of bytes, defaults to the rest of the file
+        :param writable: map read/write; changes are written back to the file
+        :return: context manager yielding a memoryview of the range
+        """
+        return MemoryMapping(self._path, offset, length, writable)
+
+
+    # awaitable counterparts, run on a bounded executor (see SetAsyncExecutor) so they never block the event loop.
+    async def AsyncRead(self, open_as_binary: bool = False, *, executor: AsyncFileExecutor = None):
+        return await (executor or GetAsyncExecutor()).Run(self.Read, open_as_binary)
+    async def AsyncWrite(self, content: Union[str, bytes] = None, *, executor: AsyncFileExecutor = None, **kwargs):
+        return await (executor or GetAsyncExecutor()).Run(self.Write, content, **kwargs)
+
+    async def AsyncReadJson(self, *, executor: AsyncFileExecutor = None, **kwargs) -> Union[List, Dict]:
+        return await (executor or GetAsyncExecutor()).Run(self.ReadJson, **kwargs)
+    async def AsyncSaveJson(self, data: Union[List, Dict], *, executor: AsyncFileExecutor = None, **kwargs):
+        return await (executor or GetAsyncExecutor()).Run(self.SaveJson, data, **kwargs)
+
+    async def AsyncReadPickle(self, *, executor: AsyncFileExecutor = None, **kwargs) -> Any:
+        return await (executor or GetAsyncExecutor()).Run(self.ReadPickle, **kwargs)
+    async def AsyncSavePickle(self, data: Any, *, executor: AsyncFileExecutor = None, **kwargs):
+        return await (executor or GetAsyncExecutor()).Run(self.SavePickle, data, **kwargs)
+
+    async def AsyncGetFileData(self, file: FileData, *, executor: AsyncFileExecutor = None, **kwargs):
+        return await (executor or GetAsyncExecutor()).Run(self.GetFileData, file, **kwargs)
+    async def AsyncSetFileData(self, data: Any, file: FileData, *, executor: AsyncFileExecutor = None, **kwargs):
+        return await (executor or GetAsyncExecutor()).Run(self.SetFileData, data, file, **kwargs)
+
+    async def AsyncGetHashID(self, BlockSize: int = 65536, algorithm: str = 'sha1', *, executor: AsyncFileExecutor = None, **kwargs) -> str:
+        return await (executor or GetAsyncExecutor()).Run(self.GetHashID, BlockSize, algorithm, **kwargs)
 
     @classmethod
-    def CreateTemporaryFile(cls, fileName: str, *sub_folders: str, root_dir: str = None):
+    def CreateTemporaryFile(cls, fileName: str, *sub_folders: str, root_dir: str = None, arena: 'TempArena' = None):
+        """ :param arena: if given, the file is created inside the TempArena and removed with it """
+        if arena is not None: return arena.CreateFile(fileName, *sub_folders)
         if not root_dir: root_dir = tempfile.gettempdir()
         os.makedirs(root_dir, exist_ok=True)
         return cls.Join(root_dir, *sub_folders, fileName)
@@ -207,7 +652,14 @@ class Path(os.PathLike):
         return path
 
     @classmethod
-    def FromString(cls, _path: Union[str, 'Path']): return cls(abspath(_path))
+    def FromString(cls, _path: Union[str, 'Path'], *, intern: bool = False, lazy: bool = False):
+        """
+        :param intern: intern the path string
+        :param lazy: defer the abspath call until the path is first used
+        """
+        if lazy: return cls(os.fspath(_path), intern=intern, lazy=True)
+        if intern: return cls(abspath(_path), intern=True)
+        return cls(abspath(_path))  # keyword arguments cost more than the rest of __init__, so the common case passes none.
 
     @classmethod
     def FromPathLibPath(cls, _path: _Path): return cls(abspath(_path.resolve()))
@@ -222,21 +674,76 @@ class Path(os.PathLike):
 
     @classmethod
     def ListDir(cls, path: Union[str, 'Path']) -> List['Path']:
-        if isfile(path): return [cls.Create(path)]
+        if isfile(path): return [cls.FromString(path)]
 
-        d = basename(path)
-        def _join(file): return cls.FromString(join(d, file))
-        return list(map(_join, os.listdir(path)))
+        return list(cls.Walk(path, max_depth=1, directories=True))
+
+    @staticmethod
+    def Scan(path: Union[str, 'Path'], *, include: Union[str, Iterable[str]] = None, exclude: Union[str, Iterable[str]] = None, max_depth: int = None,
+             files: bool = True, directories: bool = False, follow_symlinks: bool = False, workers: int = None, onerror: Callable[[OSError], Any] = None) -> Iterator[os.DirEntry]:
+        """
+            Lazily walks the tree with os.scandir, yielding the DirEntry objects so their cached type and stat data can be reused.
+
+        :param path: directory to walk
+        :param include: glob pattern(s) an entry's name must match to be yielded
+        :param exclude: glob pattern(s) for names to skip; excluded directories are not descended into
+        :param max_depth: number of levels to list; 1 lists only the entries of path, None is unlimited
+        :param files: yield non-directory entries
+        :param directories: yield directory entries
+        :param follow_symlinks: descend into symbolic links to directories
+        :param workers: if greater than 1, subtrees are scanned in parallel and entries arrive in no particular order
+        :param onerror: called with the OSError of any directory that cannot be read; ignored if None
+        :return:
+        """
+        return ScanTree(path, include=include, exclude=exclude, max_depth=max_depth, files=files, directories=directories, follow_symlinks=follow_symlinks, workers=workers, onerror=onerror)
+
+    @classmethod
+    def Walk(cls, path: Union[str, 'Path'], *, include: Union[str, Iterable[str]] = None, exclude: Union[str, Iterable[str]] = None, max_depth: int = None,
+             files: bool = True, directories: bool = False, follow_symlinks: bool = False, workers: int = None, onerror: Callable[[OSError], Any] = None) -> Iterator['Path']:
+        """ Same as Scan, but yields absolute Path objects. """
+        for entry in cls.Scan(abspath(path), include=include, exclude=exclude, max_depth=max_depth, files=files, directories=directories, follow_symlinks=follow_symlinks, workers=workers, onerror=onerror):
+            yield cls(entry.path)
+
+    def Snapshot(self, *, include: Union[str, Iterable[str]] = None, exclude: Union[str, Iterable[str]] = None, max_depth: int = None,
+                 directories: bool = False, follow_symlinks: bool = False, workers: int = None) -> Snapshot:
+        """ Records the (inode, size, mtime) of every file below this directory; diff two snapshots to find what changed in between. """
+        return Snapshot.Take(self._path, include=include, exclude=exclude, max_depth=max_depth, directories=directories, follow_symlinks=follow_symlinks, workers=workers)
+    def Watch(self, *, recursive: bool = True, exclude: Union[str, Iterable[str]] = None, attributes: bool = False) -> Watcher:
+        """ Streams changes below this directory as they happen (Linux only); see Watcher. """
+        return Watcher(self._path, recursive=recursive, exclude=exclude, attributes=attributes)
 
 
 
 
 
     @staticmethod
-    def CopyFile(_inPath: Union[str, 'Path'], _outPath: Union[str, 'Path'], open_as_binary: bool = False):
-        with open(_outPath, 'wb' if open_as_binary else 'w') as out:
-            with open(_inPath, 'rb' if open_as_binary else 'r') as _in:
-                out.write(_in.read())
+    def CopyFile(_inPath: Union[str, 'Path'], _outPath: Union[str, 'Path'], open_as_binary: bool = True, *, preserve_metadata: bool = False) -> int:
+        """
+            Byte-exact copy through reflink / copy_file_range / sendfile, falling back to a buffered readinto loop.
+
+        :param _inPath: file to copy
+        :param _outPath: destination file
+        :param open_as_binary: kept for compatibility; the copy is always binary
+        :param preserve_metadata: also copy permission bits and timestamps
+        :return: number of bytes copied
+        """
+        return _CopyFile(_inPath, _outPath, preserve_metadata=preserve_metadata)
+
+    @classmethod
+    def CopyTree(cls, _inPath: Union[str, 'Path'], _outPath: Union[str, 'Path'], *, workers: int = None, preserve_metadata: bool = False, symlinks: bool = False, exist_ok: bool = False) -> 'Path':
+        """
+            Copies a directory tree, copying many files concurrently.
+
+        :param _inPath: directory to copy
+        :param _outPath: destination directory
+        :param workers: thread count, defaults to the ThreadPoolExecutor default
+        :param preserve_metadata: also copy permission bits and timestamps
+        :param symlinks: if True, symbolic links are recreated instead of followed
+        :param exist_ok: if False, raise FileExistsError when _outPath already exists
+        :return: the destination directory
+        """
+        _CopyTree(_inPath, _outPath, workers=workers, preserve_metadata=preserve_metadata, symlinks=symlinks, exist_ok=exist_ok)
+        return cls.FromString(_outPath)
 
 
 
@@ -0,0 +1,214 @@
+import base64
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import *
+
+
+
+
+__all__ = [
+        'HashFile', 'HashFiles', 'EncodeDigest',
+        'DigestCache',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+_TPath = TypeVar("_TPath", str, os.PathLike)
+
+# files at least this large are hashed straight out of a read-only memory map instead of a copy loop.
+MMAP_THRESHOLD = 1 << 20
+
+_local = threading.local()
+
+def _GetBuffer(size: int) -> bytearray:
+    """ one reusable read buffer per thread, so the copy loop does not allocate per block. """
+    buf = getattr(_local, 'buffer', None)
+    if buf is None or len(buf) != size:
+        buf = _local.buffer = bytearray(size)
+    return buf
+
+def _AdviseSequential(fd: int):
+    if not hasattr(os, 'posix_fadvise'): return
+    try: os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except OSError: pass
+
+
+def EncodeDigest(digest: bytes) -> str: return base64.urlsafe_b64encode(digest).decode()
+
+def HashFile(path: _AnyPath, algorithm: str = 'sha1', BlockSize: int = 65536) -> str:
+    """
+    :param path: file to hash
+    :param algorithm: any name accepted by hashlib.new, such as 'sha1', 'sha256' or 'blake2b'
+    :param BlockSize: size of the reused read buffer, defaults to 64KB
+    :return: url-safe base64 encoded digest
+    """
+    hasher = hashlib.new(algorithm)
+    with open(path, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        _AdviseSequential(fd)
+        if os.fstat(fd).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as m:
+                if hasattr(m, 'madvise'): m.madvise(mmap.MADV_SEQUENTIAL)
+                hasher.update(m)
+        else:
+            buf = _GetBuffer(BlockSize)
+            view = memoryview(buf)
+            n = f.readinto(buf)
+            while n:
+                hasher.update(view[:n])
+                n = f.readinto(buf)
+
+    return EncodeDigest(hasher.digest())
+
+
+def HashFiles(paths: Iterable[_TPath], algorithm: str = 'sha1', *, workers: int = None, BlockSize: int = 65536, return_exceptions: bool = False, cache: 'DigestCache' = None) -> Iterator[Tuple[_TPath, Union[str, BaseException]]]:
+    """
+        Hashes the files on a thread pool and yields (path, digest) pairs as they complete, so results are not in input order.
+        hashlib releases the GIL while digesting, so threads scale across cores without the pickling cost of a process pool.
+        At most a few batches of work are in flight at once, so ``paths`` may be a lazy iterable of any length.
+
+    :param paths: files to hash
+    :param algorithm: any name accepted by hashlib.new
+    :param workers: thread count, defaults to the ThreadPoolExecutor default
+    :param BlockSize: size of each thread's reused read buffer
+    :param return_exceptions: if True, a failure is yielded as (path, exception) instead of being raised
+    :param cache: optional DigestCache consulted before reading each file
+    :return:
+    """
+    hashlib.new(algorithm)  # fail fast on an unknown algorithm.
+    _hash = cache.Get if cache is not None else HashFile
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        limit = executor._max_workers * 4
+        pending: Dict[Future, _TPath] = { }
+        items = iter(paths)
+
+        def _fill():
+            for path in items:
+                pending[executor.submit(_hash, path, algorithm, BlockSize)] = path
+                if len(pending) >= limit: return
+
+        _fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                error = future.exception()
+                if error is None: yield path, future.result()
+                elif return_exceptions: yield path, error
+                else:
+                    for other in pending: other.cancel()
+                    raise error
+
+            _fill()
+
+
+
+
+class DigestCache(object):
+    """
+        Persistent digest store backed by a local SQLite file.
+        An entry is valid while the file's (device, inode, size, mtime_ns) still match, so an unchanged file costs one stat call.
+        Safe to share between the threads of HashFiles; other processes may open the same database file.
+    """
+    # a file modified within this window of being hashed could change again without its mtime moving, so it is not cached.
+    RACY_WINDOW_NS = 2_000_000_000
+    COMMIT_EVERY = 256
+    def __init__(self, database: _AnyPath):
+        self._database = os.fspath(database)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._hits = 0
+        self._misses = 0
+        self._conn = sqlite3.connect(self._database, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS digests (
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (device, inode, algorithm)
+                )""")
+        self._conn.commit()
+
+    @property
+    def Hits(self) -> int: return self._hits
+    @property
+    def Misses(self) -> int: return self._misses
+    @property
+    def Count(self) -> int:
+        with self._lock: return self._conn.execute('SELECT COUNT(*) FROM digests').fetchone()[0]
+
+    def Get(self, path: _AnyPath, algorithm: str = 'sha1', BlockSize: int = 65536) -> str:
+        """ Returns the cached digest if the file is unchanged, otherwise hashes it and stores the result. """
+        st = os.stat(path)
+        with self._lock:
+            row = self._conn.execute('SELECT digest FROM digests WHERE device=? AND inode=? AND algorithm=? AND size=? AND mtime_ns=?',
+                                     (st.st_dev, st.st_ino, algorithm, st.st_size, st.st_mtime_ns)).fetchone()
+            if row is not None:
+                self._hits += 1
+                return row[0]
+
+            self._misses += 1
+
+        digest = HashFile(path, algorithm, BlockSize)
+        after = os.stat(path)
+        if (after.st_size, after.st_mtime_ns) != (st.st_size, st.st_mtime_ns): return digest  # changed while being read.
+        if time.time_ns() - st.st_mtime_ns < self.RACY_WINDOW_NS: return digest
+
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (st.st_dev, st.st_ino, algorithm, st.st_size, st.st_mtime_ns, os.path.abspath(path), digest))
+            self._pending += 1
+            if self._pending >= self.COMMIT_EVERY: self._Commit()
+
+        return digest
+
+    def Invalidate(self, path: _AnyPath = None):
+        """ Drops every entry for the given file, or the whole cache if no path is given. """
+        with self._lock:
+            if path is None: self._conn.execute('DELETE FROM digests')
+            else: self._conn.execute('DELETE FROM digests WHERE path=?', (os.path.abspath(path),))
+            self._Commit()
+
+    def Compact(self) -> int:
+        """ Removes entries whose file is gone or has changed, then reclaims the space. Returns the number of entries removed. """
+        with self._lock:
+            stale = []
+            for device, inode, algorithm, size, mtime_ns, path in self._conn.execute('SELECT device, inode, algorithm, size, mtime_ns, path FROM digests'):
+                try: st = os.stat(path)
+                except OSError:
+                    stale.append((device, inode, algorithm))
+                    continue
+
+                if (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) != (device, inode, size, mtime_ns): stale.append((device, inode, algorithm))
+
+            self._conn.executemany('DELETE FROM digests WHERE device=? AND inode=? AND algorithm=?', stale)
+            self._Commit()
+            self._conn.execute('VACUUM')
+            return len(stale)
+
+    def ResetCounters(self):
+        self._hits = 0
+        self._misses = 0
+
+    def _Commit(self):
+        self._conn.commit()
+        self._pending = 0
+    def Flush(self):
+        with self._lock: self._Commit()
+    def Close(self):
+        with self._lock:
+            self._Commit()
+            self._conn.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *args): self.Close()
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Location: "{self._database}", Hits: {self._hits}, Misses: {self._misses}>'
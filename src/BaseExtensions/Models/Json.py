@@ -1,6 +1,7 @@
 import copy
+import io
 from enum import Enum
-from json import dumps, loads
+from json import JSONEncoder, loads
 
 from .MixIns import *
 
@@ -12,7 +13,8 @@ __all__ = [
         'BaseListModel', 'BaseDictModel', 'BaseSetModel',
         'ConvertBool',
         'Assert', 'throw',
-        'RaiseKeyError', 'AssertKeys'
+        'RaiseKeyError', 'AssertKeys', 'ValidationError',
+        'JsonEncoder',
         ]
 
 _T = TypeVar("_T")
@@ -51,44 +53,101 @@ def ConvertBool(o: Union[bool, str]) -> bool:
 def RaiseKeyError(key, d: Dict): raise KeyError(f'{key} not in {d.keys()}')
 
 
+class ValidationError(KeyError, TypeError):
+    """ Every problem found while parsing a model, as (path, message) pairs; a KeyError and a TypeError, like the errors of AssertKeys and throw. """
+    def __init__(self, model: type, errors: List[Tuple[str, str]]):
+        super().__init__(model, errors)
+        self.model = model
+        self.errors = errors
+    def __str__(self): return f'{self.model.__qualname__}: ' + '; '.join(f'{path}: {message}' for path, message in self.errors)
 
-# noinspection DuplicatedCode
-def serialize(o):
-    if isinstance(o, Enum): return o.value
 
-    if isinstance(o, BaseSetModel): return o.ToList()
 
-    if isinstance(o, BaseListModel): return o
+def _EnumValue(o: Enum): return o.value
+
+def _Method(cls: type, name: str) -> Optional[Callable]:
+    method = getattr(cls, name, None)
+    return method if callable(method) else None
+
+def _SerializeStrategy(cls: type) -> Optional[Callable[[Any], Any]]:
+    """ the conversion serialize applies to instances of cls, or None to leave them as they are. """
+    if issubclass(cls, Enum): return _EnumValue
+    if issubclass(cls, BaseSetModel): return cls.ToList
+    if issubclass(cls, BaseListModel): return None
+    if issubclass(cls, BaseDictModel): return cls.ToDict
+    return _Method(cls, 'ToList') or _Method(cls, 'ToDict')
 
-    if isinstance(o, BaseDictModel): return o.ToDict()
+def _ToDictStrategy(cls: type) -> Optional[Callable[[Any], Any]]:
+    """ the conversion ToDict applies to values of type cls, or None to keep them. """
+    if issubclass(cls, Enum): return _EnumValue
+    if issubclass(cls, BaseListModel): return None
+    if issubclass(cls, BaseSetModel): return cls.ToList
+    if issubclass(cls, BaseDictModel): return cls.ToDict
+    return _Method(cls, 'ToList') or _Method(cls, 'ToDict') or _Method(cls, 'ToString')
 
-    if hasattr(o, 'ToList') and callable(o.ToList): return o.ToList()
 
-    if hasattr(o, 'ToDict') and callable(o.ToDict): return o.ToDict()
+# conversions are looked up once per type instead of once per object; natively encodable types need none.
+_NATIVE = { str: None, int: None, float: None, bool: None, type(None): None, list: None, dict: None, tuple: None }
+_serialize_dispatch: Dict[type, Optional[Callable]] = dict(_NATIVE)
+_to_dict_dispatch: Dict[type, Optional[Callable]] = dict(_NATIVE)
 
-    return o
+
+def serialize(o):
+    try: func = _serialize_dispatch[type(o)]
+    except KeyError: func = _serialize_dispatch[type(o)] = _SerializeStrategy(type(o))
+    return o if func is None else func(o)
 
 
-# noinspection DuplicatedCode
 def ToDict(o: Dict) -> Dict[_KT, Union[_VT, Dict, str]]:
+    dispatch = _to_dict_dispatch
     d = { }
     for key, value in o.items():
-        if isinstance(value, Enum): d[key] = value.value
+        try: func = dispatch[type(value)]
+        except KeyError: func = dispatch[type(value)] = _ToDictStrategy(type(value))
+        d[key] = value if func is None else func(value)
+    return d
+
 
-        elif isinstance(value, BaseListModel): d[key] = value
 
-        elif isinstance(value, BaseSetModel): d[key] = value.ToList()
+class JsonEncoder(JSONEncoder):
+    """
+        Encodes models with the conversions of serialize, chosen once per type and kept in a per-class dispatch table.
+        Without indent, the C accelerated encoder is used and only calls back into Python for types json cannot encode natively;
+        dict and list models are encoded directly.
 
-        elif isinstance(value, BaseDictModel): d[key] = value.ToDict()
+            JsonEncoder(separators=(',', ':')).encode(model)
+    """
+    _dispatch: Dict[type, Optional[Callable]] = _serialize_dispatch
 
-        elif hasattr(value, 'ToList') and callable(value.ToDict): d[key] = value.ToList()
+    # json encodes these, and their subclasses (models and IntEnums included), itself and never asks default about them.
+    _NATIVE = (dict, list, tuple, str, int, float)
 
-        elif hasattr(value, 'ToDict') and callable(value.ToDict): d[key] = value.ToDict()
+    @classmethod
+    def Register(cls, _type: type, func: Callable[[Any], Any]):
+        """
+            Sets the conversion of a type json cannot encode natively; it must return something json can encode, or another registered type.
+            Raises TypeError for dict, list, tuple, str, int and float and their subclasses, whose conversion could never be called.
+        """
+        if issubclass(_type, cls._NATIVE): raise TypeError(f'{_type.__name__} is encoded natively by json, so a conversion registered for it would never be used')
+        cls._dispatch[_type] = func
 
-        elif hasattr(value, 'ToString') and callable(value.ToString): d[key] = value.ToString()
+    def default(self, o):
+        try: func = self._dispatch[type(o)]
+        except KeyError: func = self._dispatch[type(o)] = _SerializeStrategy(type(o))
+        if func is None: return super().default(o)
+        return func(o)
 
-        else: d[key] = value
-    return d
+
+def _IsBinary(fp: Any) -> bool:
+    """ text streams are TextIOBase, were opened with a text mode, or expose an encoding; anything else, sockets included, takes bytes. """
+    if isinstance(fp, io.TextIOBase): return False
+    mode = getattr(fp, 'mode', None)
+    if isinstance(mode, str): return 'b' in mode  # GzipFile and friends report an int mode.
+    return getattr(fp, 'encoding', None) is None
+
+
+_INDENTED = JsonEncoder(indent=4)
+_COMPACT = JsonEncoder(separators=(',', ':'))
 
 
 
@@ -111,7 +170,41 @@ class BaseModel(object):
     def Parse(cls, d): return cls()
     @classmethod
     def FromJson(cls, string: Union[str, bytes, bytearray], **kwargs): return cls.Parse(loads(string, **kwargs))
-    def ToJsonString(self) -> str: return dumps(self, indent=4, default=serialize)  # , cls=JsonEncoder)
+    def ToJsonString(self, *, compact: bool = False) -> str:
+        """ :param compact: no indentation or whitespace, which also lets the C accelerated encoder do the work """
+        return (_COMPACT if compact else _INDENTED).encode(self)
+    def WriteJson(self, fp: Union[IO, Any], *, chunk_size: int = 64 * 1024, compact: bool = False, encoding: str = 'utf-8', binary: bool = None) -> int:
+        """
+            Encodes incrementally and writes the output in chunks of about chunk_size characters,
+            so memory stays bounded however large the model is; the whole string is never built.
+
+        :param fp: binary or text file object, or a socket
+        :param chunk_size: characters buffered per write
+        :param compact: no indentation or whitespace
+        :param encoding: used when fp is binary
+        :param binary: whether fp takes bytes; by default it is detected, see _IsBinary
+        :return: number of characters written
+        """
+        text = not (_IsBinary(fp) if binary is None else binary)
+        write = getattr(fp, 'write', None) or fp.sendall
+        written = size = 0
+        pending: List[str] = []
+        for part in (_COMPACT if compact else _INDENTED).iterencode(self):
+            pending.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                chunk = ''.join(pending)
+                write(chunk if text else chunk.encode(encoding))
+                written += size
+                pending.clear()
+                size = 0
+
+        if pending:
+            chunk = ''.join(pending)
+            write(chunk if text else chunk.encode(encoding))
+            written += size
+
+        return written
 
 
 
@@ -226,6 +319,18 @@ class BaseDictModel(dict, BaseModel, Dict[_KT, _VT]):
     def ToList(self) -> List[_T]: return list(self.items())
     def ToDict(self) -> Dict[_KT, Union[_VT, Dict, str]]: return ToDict(self)
 
+
+    # key -> None for any value, a type or tuple of types, a model class parsed in place, or List[model or type].
+    # subclasses that declare Fields get a Parse generated for them when they are defined.
+    Fields: ClassVar[Optional[Dict[str, Any]]] = None
+    # whether the generated Parse returns None for None.
+    Nullable: ClassVar[bool] = False
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.Fields is None or 'Parse' in cls.__dict__: return
+        if not getattr(cls.Parse.__func__, '__generated__', False) and cls.Parse.__func__ is not BaseDictModel.Parse.__func__: return  # keeps an inherited hand written Parse
+        cls.Parse = _CompileParse(cls)
+
     @classmethod
     def Parse(cls, d):
         if isinstance(d, dict):
@@ -236,3 +341,97 @@ class BaseDictModel(dict, BaseModel, Dict[_KT, _VT]):
     @classmethod
     def Create(cls, **kwargs: _VT):
         return cls(kwargs)
+
+
+
+_ANY, _TYPE, _MODEL, _LIST = range(4)
+
+def _FieldSpec(owner: type, key: str, spec: Any) -> Tuple[int, Any]:
+    if spec is None or spec is Any: return _ANY, None
+    if isinstance(spec, type) and issubclass(spec, BaseModel): return _MODEL, spec
+    if get_origin(spec) is list:
+        item, = get_args(spec) or (Any,)
+        kind, item = _FieldSpec(owner, key, item)
+        if kind == _LIST: raise TypeError(f'{owner.__qualname__}.{key}: nested lists are not supported')
+        return _LIST, (kind, item)
+    if isinstance(spec, type) or (isinstance(spec, tuple) and all(isinstance(t, type) for t in spec)): return _TYPE, spec
+    raise TypeError(f'{owner.__qualname__}.{key}: unsupported field declaration {spec!r}')
+
+def _TypeNames(spec: Union[type, Tuple[type, ...]]) -> str:
+    return ' or '.join(t.__name__ for t in spec) if isinstance(spec, tuple) else spec.__name__
+
+def _Check(kind: int, spec: Any, value: Any, path: str, errors: List[Tuple[str, str]]):
+    if kind == _TYPE:
+        if not isinstance(value, spec): errors.append((path, f'expected {_TypeNames(spec)}, got {type(value).__name__}'))
+    elif kind == _MODEL:
+        try: spec.Parse(value)
+        except ValidationError as e: errors.extend((f'{path}.{inner}', message) for inner, message in e.errors)
+        except (KeyError, TypeError, ValueError) as e: errors.append((path, str(e)))
+    elif kind == _LIST:
+        if not isinstance(value, list): errors.append((path, f'expected list, got {type(value).__name__}'))
+        else:
+            for i, item in enumerate(value): _Check(*spec, item, f'{path}[{i}]', errors)
+
+def _Slow(cls: type, d: Dict, specs: List[Tuple[str, int, Any]]):
+    """
+        the slow path of a generated Parse: collects every error instead of stopping at the first one.
+        It agrees with the fast path by construction, so finding nothing wrong is a bug in the generated code and raises RuntimeError.
+    """
+    errors = []
+    for key, kind, spec in specs:
+        if key not in d: errors.append((key, 'missing'))
+        else: _Check(kind, spec, d[key], key, errors)
+
+    if errors: raise ValidationError(cls, errors)
+    raise RuntimeError(f'{cls.__qualname__}.Parse: the generated fast path rejected a value the slow path accepts: {d!r}')
+
+
+def _CompileParse(cls: type) -> classmethod:
+    """
+        Generates the source of a Parse specialized for cls.Fields and compiles it once:
+        a single pass that fetches every field, checks types with isinstance, parses nested models in place,
+        and only falls back to _Slow, which reports every error together, when something is wrong.
+    """
+    specs = [(key, *_FieldSpec(cls, key, spec)) for key, spec in cls.Fields.items()]
+    namespace = dict(_Slow=_Slow, _specs=specs, _set=dict.__setitem__, _new=dict.__new__, _update=dict.update, throw=throw)
+    checks, parses = [], []
+    for i, (key, kind, spec) in enumerate(specs):
+        namespace[f'_k{i}'] = key
+        if kind == _TYPE:
+            namespace[f'_t{i}'] = spec
+            checks.append(f'isinstance(v{i}, _t{i})')
+        elif kind == _MODEL:
+            namespace[f'_t{i}'], namespace[f'_p{i}'] = spec, spec.Parse
+            parses.append(f'if v{i}.__class__ is not _t{i}: _set(o, _k{i}, _p{i}(v{i}))')
+        elif kind == _LIST:
+            item_kind, item = spec
+            checks.append(f'isinstance(v{i}, list)')
+            if item_kind == _TYPE:
+                namespace[f'_t{i}'] = item
+                checks.append(f'all([isinstance(item, _t{i}) for item in v{i}])')
+            elif item_kind == _MODEL:
+                namespace[f'_p{i}'] = item.Parse
+                parses.append(f'_set(o, _k{i}, [_p{i}(item) for item in v{i}])')
+
+    # a subclass that keeps dict's constructor can skip calling __init__.
+    construct = ['o = _new(cls)', '_update(o, d)'] if cls.__init__ is BaseDictModel.__init__ else ['o = cls(d)']
+    lines = ['def Parse(cls, d):']
+    if cls.Nullable: lines.append('    if d is None: return None')
+    lines.append('    if not isinstance(d, dict): throw(d, dict)')
+    if specs:
+        lines.append('    try:')
+        lines += [f'        v{i} = d[_k{i}]' for i in range(len(specs))]
+        lines.append('    except KeyError: return _Slow(cls, d, _specs)')
+    if checks: lines.append(f'    if not ({" and ".join(checks)}): return _Slow(cls, d, _specs)')
+    lines += [f'    {line}' for line in construct]
+    if parses:
+        lines.append('    try:')
+        lines += [f'        {line}' for line in parses]
+        lines.append('    except (KeyError, TypeError, ValueError): return _Slow(cls, d, _specs)')
+    lines.append('    return o')
+
+    exec(compile('\n'.join(lines), f'<{cls.__qualname__}.Parse>', 'exec'), namespace)
+    func = namespace['Parse']
+    func.__qualname__ = f'{cls.__qualname__}.Parse'
+    func.__generated__ = True
+    return classmethod(func)
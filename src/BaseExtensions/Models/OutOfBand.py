@@ -0,0 +1,166 @@
+import io
+import json
+import mmap
+import os
+import pickle
+import secrets
+import struct
+from typing import *
+
+
+
+
+__all__ = [
+        'DumpOutOfBand', 'LoadOutOfBand', 'WriteBuffers', 'ReadBuffers',
+        'WriteHeader', 'ReadHeader', 'SidecarName',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+_Index = List[Tuple[int, int, int]]
+
+# buffers start on this boundary, so typed arrays loaded from the mapping stay aligned.
+ALIGNMENT = 64
+
+# bytes and bytearray objects at least this large are moved out of band as well; other types opt in by reducing to a PickleBuffer.
+# they are rebuilt as copies of the mapping unless LoadOutOfBand is asked for views.
+THRESHOLD = 64 * 1024
+
+# an out-of-band pickle file starts with MAGIC and a length prefixed JSON header naming its sidecar, followed by the data pickled with protocol 5.
+# no pickle starts with a NUL byte, and the header is found by reading a few bytes without unpickling anything.
+MAGIC = b'\0BXOOB\x02\n'
+_LENGTH = struct.Struct('<I')
+
+# persistent ids of bytes and bytearray entries.
+HEADER_TAG = 'BaseExtensions.OutOfBand/2'
+
+# kinds of sidecar entries: a protocol 5 PickleBuffer, or a bytes / bytearray referenced by persistent id.
+_BUFFER, _BYTES, _BYTEARRAY = 0, 1, 2
+
+
+
+def SidecarName(file_name: str) -> str:
+    """ every save gets a new sidecar, so the previous one stays valid until the file that references it is replaced. """
+    return f'{file_name}.{secrets.token_hex(8)}.buffers'
+
+def WriteHeader(f: BinaryIO, sidecar: str, index: _Index):
+    header = json.dumps({ 'sidecar': sidecar, 'index': index }, separators=(',', ':')).encode()
+    f.write(MAGIC)
+    f.write(_LENGTH.pack(len(header)))
+    f.write(header)
+
+def ReadHeader(f: BinaryIO) -> Optional[Tuple[str, _Index]]:
+    """ (sidecar, index) of an out-of-band pickle, leaving f at its data; otherwise None, with f rewound to the start. """
+    if f.read(len(MAGIC)) != MAGIC:
+        f.seek(0)
+        return None
+
+    try:
+        length, = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length))
+        return header['sidecar'], [tuple(entry) for entry in header['index']]
+    except (struct.error, ValueError, KeyError, TypeError) as e: raise pickle.UnpicklingError(f'corrupt out of band header: {e}') from e
+
+
+
+class _OutOfBandPickler(pickle.Pickler):
+    """
+        The C pickler writes bytes and bytearray in-band before consulting reducer_override or the dispatch table,
+        so large ones are intercepted through persistent_id, which it checks first for every object.
+    """
+    def __init__(self, f: BinaryIO, buffers: List[Tuple[Any, int]], threshold: int, **kwargs):
+        super().__init__(f, buffer_callback=self._Collect, **kwargs)
+        self._buffers = buffers
+        self._threshold = threshold
+        self._seen: Dict[int, int] = { }
+
+    def _Collect(self, buffer: pickle.PickleBuffer) -> bool:
+        try: buffer.raw().release()
+        except BufferError: return True  # non-contiguous buffers stay in-band.
+
+        self._buffers.append((buffer, _BUFFER))
+        return False
+
+    def persistent_id(self, obj):
+        _type = type(obj)
+        if _type is bytes: kind = _BYTES
+        elif _type is bytearray: kind = _BYTEARRAY
+        else: return None
+
+        if len(obj) < self._threshold: return None
+
+        position = self._seen.get(id(obj))
+        if position is None:
+            position = self._seen[id(obj)] = len(self._buffers)
+            self._buffers.append((obj, kind))
+        return HEADER_TAG, position
+
+
+class _OutOfBandUnpickler(pickle.Unpickler):
+    def __init__(self, f: BinaryIO, views: List[memoryview], index: _Index, as_views: bool = False, **kwargs):
+        super().__init__(f, buffers=[view for view, (_, _, kind) in zip(views, index) if kind == _BUFFER], **kwargs)
+        self._views = views
+        self._index = index
+        self._as_views = as_views
+        self._loaded: Dict[int, Union[bytes, bytearray]] = { }
+
+    def persistent_load(self, pid):
+        if type(pid) is not tuple or len(pid) != 2 or pid[0] != HEADER_TAG: raise pickle.UnpicklingError(f'unsupported persistent id: {pid!r}')
+
+        # shared references were written once, so they are rebuilt once.
+        position = pid[1]
+        obj = self._loaded.get(position)
+        if obj is None:
+            view, kind = self._views[position], self._index[position][2]
+            if self._as_views: obj = self._loaded[position] = view
+            else: obj = self._loaded[position] = bytes(view) if kind == _BYTES else bytearray(view)
+        return obj
+
+
+
+def DumpOutOfBand(data: Any, buffers: List[Tuple[Any, int]], *, threshold: int = THRESHOLD, **kwargs) -> bytes:
+    """ Pickles data with protocol 5, appending its out of band buffers to buffers and returning only the in-band stream. """
+    with io.BytesIO() as f:
+        _OutOfBandPickler(f, buffers, threshold, **kwargs).dump(data)
+        return f.getvalue()
+
+def LoadOutOfBand(f: BinaryIO, views: List[memoryview], index: _Index, *, as_views: bool = False, **kwargs) -> Any:
+    """ :param as_views: rebuild bytes and bytearray entries as memoryviews of the mapping instead of copying them """
+    return _OutOfBandUnpickler(f, views, index, as_views, **kwargs).load()
+
+
+def WriteBuffers(f: BinaryIO, buffers: Iterable[Tuple[Any, int]]) -> _Index:
+    """ Writes the raw bytes of each buffer, aligned, and returns their (offset, length, kind) index. """
+    index: _Index = []
+    offset = 0
+    for buffer, kind in buffers:
+        with (buffer.raw() if kind == _BUFFER else memoryview(buffer)) as view:
+            padding = -offset % ALIGNMENT
+            if padding: f.write(b'\0' * padding)
+            offset += padding
+
+            f.write(view)
+            index.append((offset, view.nbytes, kind))
+            offset += view.nbytes
+
+    return index
+
+
+def ReadBuffers(path: _AnyPath, index: _Index, writable: bool = False) -> List[memoryview]:
+    """
+        Maps the sidecar and returns one zero-copy view per entry.
+        The mapping stays alive as long as any object built on one of the views does.
+
+    :param writable: map copy-on-write, so loaded objects are mutable without touching the file
+    """
+    if not index: return []
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = max(offset + length for offset, length, _ in index)
+        if size < end: raise pickle.UnpicklingError(f'"{path}" is truncated: {size} bytes, expected at least {end}')
+        if not size: return [memoryview(b'') for _ in index]
+
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+
+    view = memoryview(m)
+    return [view[offset:offset + length] for offset, length, _ in index]
@@ -26,6 +26,8 @@ class RotationAngle(IntEnum):
 
 class Size(BaseDictModel):
     __slots__ = []
+    Fields = { Keys.width: None, Keys.height: None }
+    Nullable = True
     @property
     def width(self) -> int: return self.get(Keys.width)
     @property
@@ -37,15 +39,6 @@ class Size(BaseDictModel):
     def FromTuple(v: Tuple[int, int]): return Size.Create(*v)
     @classmethod
     def Create(cls, width: int, height: int): return cls({ Keys.width: width, Keys.height: height })
-
-    @classmethod
-    def Parse(cls, d):
-        if d is None: return None
-        if isinstance(d, dict):
-            AssertKeys(d, Keys.width, Keys.height)
-            return cls(d)
-
-        throw(d, dict)
 class Ratios(Size):
     @property
     def LANDSCAPE(self) -> float: return self.width / self.height
@@ -56,6 +49,8 @@ class Ratios(Size):
 
 class Point(BaseDictModel[str, int]):
     __slots__ = []
+    Fields = { Keys.x: None, Keys.y: None }
+    Nullable = True
     @property
     def y(self) -> int: return self[Keys.y]
     @property
@@ -68,19 +63,11 @@ class Point(BaseDictModel[str, int]):
     @classmethod
     def Create(cls, x: int, y: int): return cls({ Keys.x: x, Keys.y: y })
 
-    @classmethod
-    def Parse(cls, d):
-        if d is None: return None
-        if isinstance(d, dict):
-            AssertKeys(d, Keys.x, Keys.y)
-            return cls(d)
-
-        throw(d, dict)
-
 
 class CropBox(BaseDictModel[str, int]):
     """  Adjusted box (x, y, width, height), ensuring that all dimensions resides within the boundaries. """
     __slots__ = []
+    Fields = { Keys.x: None, Keys.y: None, Keys.width: None, Keys.height: None }
     @property
     def y(self) -> int: return self[Keys.y]
     @property
@@ -247,11 +234,3 @@ class CropBox(BaseDictModel[str, int]):
 
         print(dict(x1=x1, y1=y1, x2=x2, y2=y2))
         return CropBox.Create(int(x1), int(y1), int(x2 - x1), int(y2 - y1))
-
-    @classmethod
-    def Parse(cls, d):
-        if isinstance(d, dict):
-            AssertKeys(d, Keys.width, Keys.height, Keys.x, Keys.y)
-            return cls(d)
-
-        throw(d, dict)
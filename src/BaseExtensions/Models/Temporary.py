@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from typing import *
+
+from .Files import Path
+
+
+
+
+__all__ = [
+        'TempArena',
+        ]
+
+# tmpfs mount that keeps short lived files in memory on Linux.
+SHARED_MEMORY = '/dev/shm'
+
+
+
+def _SharedMemoryAvailable() -> bool: return os.path.isdir(SHARED_MEMORY) and os.access(SHARED_MEMORY, os.W_OK | os.X_OK)
+
+def _Cleanup(directories: List[str], tracked: Set[str]):
+    for directory in directories: shutil.rmtree(directory, ignore_errors=True)
+    for path in tracked:
+        try: os.remove(path)
+        except OSError: pass
+
+
+
+class TempArena(object):
+    """
+        Owns every temporary file created through it and deletes them together when the block exits,
+        instead of one by one from finalizers. Files live in private directories, so cleanup is one rmtree per directory.
+        Small files go to /dev/shm when it is available, and anything still present at interpreter exit is removed then.
+
+            with TempArena() as arena:
+                path = arena.CreateFile('frame.png')
+    """
+    def __init__(self, root_dir: str = None, *, prefer_memory: bool = True, memory_limit: int = 4 * 1024 * 1024, prefix: str = 'arena-'):
+        """
+        :param root_dir: where on-disk files are placed, defaults to tempfile.gettempdir()
+        :param prefer_memory: place files created with a size_hint up to memory_limit on /dev/shm
+        :param memory_limit: largest size_hint, in bytes, that is kept in memory
+        :param prefix: prefix of the arena's private directories
+        """
+        self._root_dir = root_dir or tempfile.gettempdir()
+        self._prefer_memory = prefer_memory and _SharedMemoryAvailable()
+        self._memory_limit = memory_limit
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._disk: Optional[str] = None
+        self._memory: Optional[str] = None
+        self._directories: List[str] = []
+        self._tracked: Set[str] = set()
+        self._finalizer = weakref.finalize(self, _Cleanup, self._directories, self._tracked)
+
+    def _Directory(self, memory: bool) -> str:
+        with self._lock:
+            if memory:
+                if self._memory is None:
+                    self._memory = tempfile.mkdtemp(prefix=self._prefix, dir=SHARED_MEMORY)
+                    self._directories.append(self._memory)
+                return self._memory
+
+            if self._disk is None:
+                os.makedirs(self._root_dir, exist_ok=True)
+                self._disk = tempfile.mkdtemp(prefix=self._prefix, dir=self._root_dir)
+                self._directories.append(self._disk)
+            return self._disk
+
+    def CreateFile(self, fileName: str, *sub_folders: str, size_hint: int = None) -> Path:
+        """
+            Returns the path of a new file inside the arena; the file itself is not created.
+
+        :param fileName: name of the file
+        :param sub_folders: folders inside the arena, created as needed
+        :param size_hint: expected size in bytes; small files are kept on /dev/shm when available
+        """
+        memory = self._prefer_memory and size_hint is not None and size_hint <= self._memory_limit
+        directory = os.path.join(self._Directory(memory), *sub_folders)
+        if sub_folders: os.makedirs(directory, exist_ok=True)
+        return Path.Join(directory, fileName)
+
+    def Track(self, path: Union[str, Path]) -> Union[str, Path]:
+        """ Makes the arena also delete a file that was created outside of it. """
+        with self._lock: self._tracked.add(os.path.abspath(path))
+        return path
+
+    @staticmethod
+    def MemoryFile(name: str = 'scratch', mode: str = 'w+b') -> IO:
+        """
+            An anonymous in-memory file (memfd on Linux) that has no path and is freed when closed;
+            falls back to an ordinary unnamed temporary file elsewhere.
+        """
+        if hasattr(os, 'memfd_create'): return open(os.memfd_create(name), mode)
+        return tempfile.TemporaryFile(mode)
+
+    def Cleanup(self):
+        """ Deletes everything now; the arena can keep being used afterwards. """
+        with self._lock:
+            directories, tracked = list(self._directories), set(self._tracked)
+            self._directories.clear()
+            self._tracked.clear()
+            self._disk = self._memory = None
+
+        _Cleanup(directories, tracked)
+
+    def __enter__(self): return self
+    def __exit__(self, *args): self.Cleanup()
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Directories: {self._directories}, Tracked: {len(self._tracked)}>'
@@ -0,0 +1,141 @@
+import os
+import queue
+import threading
+from fnmatch import fnmatch
+from typing import *
+
+from ..Threads import AutoStartTargetedThread
+
+
+
+
+__all__ = [
+        'ScanTree',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+_Patterns = Union[str, Iterable[str], None]
+
+_DONE = object()
+
+
+
+class _Scanner(object):
+    """ Filtering rules shared by the serial and the threaded walk. """
+    def __init__(self, include: _Patterns, exclude: _Patterns, max_depth: Optional[int], files: bool, directories: bool, follow_symlinks: bool, onerror: Optional[Callable[[OSError], Any]]):
+        self.include = (include,) if isinstance(include, str) else tuple(include or ())
+        self.exclude = (exclude,) if isinstance(exclude, str) else tuple(exclude or ())
+        self.max_depth = max_depth
+        self.files = files
+        self.directories = directories
+        self.follow_symlinks = follow_symlinks
+        self.onerror = onerror
+
+    def Entries(self, directory: str, depth: int) -> Iterator[Tuple[os.DirEntry, bool, bool]]:
+        """ Lazily yields (entry, wanted, descend) for every entry of the directory that is not excluded. """
+        descend = self.max_depth is None or depth < self.max_depth
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if self.exclude and any(fnmatch(name, p) for p in self.exclude): continue
+
+                    # Like os.walk, a link to a directory is a directory; only descending into it depends on follow_symlinks.
+                    # DirEntry answers both from the d_type returned by the directory read; only links cost a stat call.
+                    try: is_dir = entry.is_dir()
+                    except OSError: is_dir = False
+
+                    try: follow = is_dir and (self.follow_symlinks or not entry.is_symlink())
+                    except OSError: follow = False
+
+                    wanted = (self.directories if is_dir else self.files) and (not self.include or any(fnmatch(name, p) for p in self.include))
+                    yield entry, wanted, follow and descend
+
+        except OSError as e:
+            if self.onerror is not None: self.onerror(e)
+
+
+
+def _SerialScan(root: str, scanner: _Scanner) -> Iterator[os.DirEntry]:
+    stack: List[Tuple[str, int]] = [(root, 1)]
+    while stack:
+        directory, depth = stack.pop()
+        subdirectories: List[Tuple[str, int]] = []
+        for entry, wanted, descend in scanner.Entries(directory, depth):
+            if wanted: yield entry
+            if descend: subdirectories.append((entry.path, depth + 1))
+
+        stack.extend(reversed(subdirectories))
+
+
+def _ThreadedScan(root: str, scanner: _Scanner, workers: int) -> Iterator[os.DirEntry]:
+    results = queue.Queue(maxsize=workers * 256)
+    work = queue.Queue()
+    stop = threading.Event()
+    lock = threading.Lock()
+    outstanding = [1]
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full: continue
+        return False
+
+    def _worker():
+        while True:
+            item = work.get()
+            if item is None: return
+
+            directory, depth = item
+            try:
+                for entry, wanted, descend in scanner.Entries(directory, depth):
+                    if wanted and not _put(entry): break
+                    if descend:
+                        with lock: outstanding[0] += 1
+                        work.put((entry.path, depth + 1))
+
+            except BaseException as e: _put(e)
+            finally:
+                with lock:
+                    outstanding[0] -= 1
+                    finished = outstanding[0] == 0
+
+                if finished: _put(_DONE)
+
+    work.put((root, 1))
+    threads = [AutoStartTargetedThread(_worker, Name=f'ScanTree-{i}') for i in range(workers)]
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE: return
+            if isinstance(item, BaseException): raise item
+            yield item
+    finally:
+        stop.set()
+        for _ in threads: work.put(None)
+        for thread in threads: thread.join()
+
+
+def ScanTree(root: _AnyPath, *, include: _Patterns = None, exclude: _Patterns = None, max_depth: int = None, files: bool = True, directories: bool = False,
+             follow_symlinks: bool = False, workers: int = None, onerror: Callable[[OSError], Any] = None) -> Iterator[os.DirEntry]:
+    """
+        Lazily walks a directory tree with os.scandir, yielding the DirEntry objects themselves so their cached type and stat data can be reused.
+        Memory stays constant in the size of each directory; only the paths of pending subdirectories are kept.
+
+    :param root: directory to walk
+    :param include: glob pattern(s) an entry's name must match to be yielded; does not stop descent
+    :param exclude: glob pattern(s) for names to skip entirely; excluded directories are not descended into
+    :param max_depth: number of levels to list; 1 lists only the entries of root, None is unlimited
+    :param files: yield non-directory entries
+    :param directories: yield directory entries
+    :param follow_symlinks: descend into symbolic links to directories; they are directories either way, as with os.walk
+    :param workers: if greater than 1, subtrees are scanned by this many threads and entries arrive in no particular order
+    :param onerror: called with the OSError of any directory that cannot be read; errors are ignored if None
+    :return:
+    """
+    scanner = _Scanner(include, exclude, max_depth, files, directories, follow_symlinks, onerror)
+    root = os.fspath(root)
+    if workers is not None and workers > 1: return _ThreadedScan(root, scanner, workers)
+    return _SerialScan(root, scanner)
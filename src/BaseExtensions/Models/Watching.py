@@ -0,0 +1,329 @@
+import ctypes
+import errno
+import os
+import select
+import struct
+import threading
+import time
+import weakref
+from enum import Enum
+from fnmatch import fnmatch
+from typing import *
+
+from .Walking import ScanTree
+from ..Constants import PlatformIsLinux
+
+
+
+
+__all__ = [
+        'ChangeKind', 'Change', 'SnapshotEntry', 'Snapshot', 'Watcher',
+        ]
+
+_AnyPath = Union[str, os.PathLike]
+_Patterns = Union[str, Iterable[str], None]
+
+
+
+class ChangeKind(str, Enum):
+    Added = 'added'
+    Removed = 'removed'
+    Modified = 'modified'
+    Moved = 'moved'
+    Overflow = 'overflow'  # the kernel dropped events; rescan the tree (for example by diffing a new Snapshot).
+
+class Change(NamedTuple):
+    Kind: ChangeKind
+    Path: str
+    Previous: Optional[str] = None  # the old path of a moved entry.
+    IsDirectory: bool = False
+
+class SnapshotEntry(NamedTuple):
+    Inode: int
+    Device: int
+    Size: int
+    ModifiedTime: int  # nanoseconds
+    IsDirectory: bool
+
+
+
+class Snapshot(object):
+    """
+        The (inode, size, mtime) of every entry of a tree, keyed by path relative to its root.
+        Snapshots are picklable, so one can be saved after a run and diffed against a new one at the start of the next.
+    """
+    __slots__ = ['Root', 'Entries', 'Time']
+    def __init__(self, Root: str, Entries: Dict[str, SnapshotEntry], Time: float):
+        self.Root = Root
+        self.Entries = Entries
+        self.Time = Time
+
+    @classmethod
+    def Take(cls, root: _AnyPath, *, include: _Patterns = None, exclude: _Patterns = None, max_depth: int = None, directories: bool = False,
+             follow_symlinks: bool = False, workers: int = None) -> 'Snapshot':
+        """
+            Walks the tree with ScanTree and records one lstat per entry.
+
+        :param directories: also record directories, whose mtime changes when entries are added to or removed from them
+        """
+        root = os.path.abspath(root)
+        start = len(root) + 1
+        entries: Dict[str, SnapshotEntry] = { }
+        for entry in ScanTree(root, include=include, exclude=exclude, max_depth=max_depth, directories=directories, follow_symlinks=follow_symlinks, workers=workers):
+            try: st = entry.stat(follow_symlinks=False)
+            except FileNotFoundError: continue  # removed while walking.
+
+            entries[entry.path[start:]] = SnapshotEntry(st.st_ino, st.st_dev, st.st_size, st.st_mtime_ns, entry.is_dir())
+
+        return cls(root, entries, time.time())
+
+    def Diff(self, other: 'Snapshot') -> Iterator[Change]:
+        """
+            Yields what changed from this snapshot to a newer one: moves first, then removals, additions and modifications, each sorted by path.
+            A removed and an added entry with the same inode, size and mtime are reported as one move;
+            an entry whose path stayed but whose inode changed was replaced, for example by an atomic write, and is reported as modified.
+        """
+        old, new = self.Entries, other.Entries
+        removed = { name: entry for name, entry in old.items() if name not in new }
+        added = { name: entry for name, entry in new.items() if name not in old }
+
+        by_inode = { (entry.Device, entry.Inode): name for name, entry in removed.items() }
+        moves: List[Tuple[str, str]] = []
+        for name, entry in added.items():
+            previous = by_inode.get((entry.Device, entry.Inode))
+            if previous is None: continue
+
+            before = removed[previous]
+            if before.Size == entry.Size and before.ModifiedTime == entry.ModifiedTime and before.IsDirectory == entry.IsDirectory:
+                moves.append((previous, name))
+                del by_inode[(entry.Device, entry.Inode)]
+
+        for previous, name in sorted(moves, key=lambda o: o[1]):
+            del removed[previous]
+            del added[name]
+            yield Change(ChangeKind.Moved, os.path.join(other.Root, name), os.path.join(self.Root, previous), new[name].IsDirectory)
+
+        for name in sorted(removed): yield Change(ChangeKind.Removed, os.path.join(self.Root, name), None, removed[name].IsDirectory)
+        for name in sorted(added): yield Change(ChangeKind.Added, os.path.join(other.Root, name), None, added[name].IsDirectory)
+        for name in sorted(old.keys() & new.keys()):
+            before, after = old[name], new[name]
+            if before.Inode != after.Inode or before.Size != after.Size or before.ModifiedTime != after.ModifiedTime:
+                yield Change(ChangeKind.Modified, os.path.join(other.Root, name), None, after.IsDirectory)
+
+    def __len__(self): return len(self.Entries)
+    def __contains__(self, item: str): return item in self.Entries
+    def __getitem__(self, item: str) -> SnapshotEntry: return self.Entries[item]
+    def __iter__(self) -> Iterator[str]: return iter(self.Entries)
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Root: {self.Root}, Entries: {len(self.Entries)}>'
+
+
+
+# <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+_EVENT = struct.Struct('iIII')
+_BUFFER_SIZE = 64 * 1024
+
+_libc = None
+
+def _LibC():
+    global _libc
+    if _libc is None:
+        if not PlatformIsLinux: raise NotImplementedError('Watching a directory requires inotify, which is only available on Linux')
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return _libc
+
+def _CloseDescriptors(fds: Tuple[int, ...]):
+    for fd in fds:
+        try: os.close(fd)
+        except OSError: pass
+
+
+
+class Watcher(object):
+    """
+        Streams changes below a directory from Linux inotify, so only what changed needs to be processed.
+        Files report Added when created and Modified when a writer closes them, so reprocess on Modified (or Moved, for atomic writes);
+        a rename inside the tree arrives as one Moved change. New subdirectories are watched as they appear.
+
+            with Path('data').Watch() as watcher:
+                for change in watcher: ...
+    """
+    def __init__(self, root: _AnyPath, *, recursive: bool = True, exclude: _Patterns = None, attributes: bool = False):
+        """
+        :param root: directory to watch
+        :param recursive: also watch every subdirectory
+        :param exclude: glob pattern(s) for names to ignore; excluded directories are not watched
+        :param attributes: also report permission, ownership and timestamp changes as Modified
+        """
+        self._libc = _LibC()
+        self.Root = os.path.abspath(root)
+        self.recursive = recursive
+        self.exclude = (exclude,) if isinstance(exclude, str) else tuple(exclude or ())
+        self._mask = _WATCH_MASK | (IN_ATTRIB if attributes else 0)
+        self._lock = threading.Lock()
+        self._watches: Dict[int, str] = { }
+        self._closed = False
+        self._reading = False
+
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+
+        self._fd = fd
+        self._wake_read, self._wake_write = os.pipe()
+        self._finalizer = weakref.finalize(self, _CloseDescriptors, (self._fd, self._wake_read, self._wake_write))
+        try: self._AddTree(self.Root)
+        except BaseException:
+            self.Close()
+            raise
+
+    def _AddWatch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self._mask)
+        if wd < 0:
+            e = ctypes.get_errno()
+            if e in (errno.ENOENT, errno.ENOTDIR): return  # removed, or replaced by a file, before it could be watched.
+            raise OSError(e, f'{os.strerror(e)}: cannot watch "{directory}"' + (' (raise fs.inotify.max_user_watches)' if e == errno.ENOSPC else ''))
+
+        with self._lock: self._watches[wd] = directory
+
+    def _AddTree(self, directory: str) -> List[Change]:
+        """ watches directory and, if recursive, everything below it; returns its current contents, which appeared before the watch did. """
+        self._AddWatch(directory)
+        if not self.recursive: return []
+
+        found: List[Change] = []
+        for entry in ScanTree(directory, exclude=self.exclude, directories=True):
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir: self._AddWatch(entry.path)
+            found.append(Change(ChangeKind.Added, entry.path, None, is_dir))
+        return found
+
+    def _Excluded(self, name: str) -> bool: return any(fnmatch(name, p) for p in self.exclude)
+
+    def _RemoveTree(self, directory: str):
+        prefix = directory + os.sep
+        with self._lock:
+            wds = [wd for wd, path in self._watches.items() if path == directory or path.startswith(prefix)]
+            for wd in wds: del self._watches[wd]
+
+        for wd in wds: self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _MoveTree(self, previous: str, directory: str):
+        prefix = previous + os.sep
+        with self._lock:
+            for wd, path in self._watches.items():
+                if path == previous: self._watches[wd] = directory
+                elif path.startswith(prefix): self._watches[wd] = directory + path[len(previous):]
+
+    def Read(self, timeout: float = None) -> List[Change]:
+        """
+            Waits up to timeout seconds (None is forever) for events and returns the changes they describe, in order;
+            an empty list means the timeout expired or the watcher was closed.
+        """
+        with self._lock:
+            if self._closed: return []
+            self._reading = True
+
+        try:
+            ready, _, _ = select.select([self._fd, self._wake_read], [], [], timeout)
+            if self._fd not in ready or self._closed: return []
+
+            data = b''
+            while True:
+                try: data += os.read(self._fd, _BUFFER_SIZE)
+                except BlockingIOError: break
+        finally:
+            # a Close that arrived while waiting leaves the descriptors to this thread, so select never sees them closed.
+            with self._lock:
+                self._reading = False
+                release = self._closed
+            if release: self._finalizer()
+
+        changes: List[Change] = []
+        moved_from: Dict[int, Tuple[str, bool]] = { }
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0'))
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                changes.append(Change(ChangeKind.Overflow, self.Root))
+                continue
+
+            with self._lock: directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                with self._lock: self._watches.pop(wd, None)
+                continue
+            if directory is None: continue
+
+            if name and self._Excluded(name): continue
+
+            path = os.path.join(directory, name) if name else directory
+            is_dir = bool(mask & IN_ISDIR)
+
+            if mask & IN_MOVED_FROM: moved_from[cookie] = path, is_dir
+            elif mask & IN_MOVED_TO:
+                previous = moved_from.pop(cookie, None)
+                if previous is None:
+                    changes.append(Change(ChangeKind.Added, path, None, is_dir))
+                    if is_dir and self.recursive: changes.extend(self._AddTree(path))
+                else:
+                    changes.append(Change(ChangeKind.Moved, path, previous[0], is_dir))
+                    if is_dir: self._MoveTree(previous[0], path)
+            elif mask & IN_CREATE:
+                changes.append(Change(ChangeKind.Added, path, None, is_dir))
+                if is_dir and self.recursive: changes.extend(self._AddTree(path))
+            elif mask & IN_DELETE: changes.append(Change(ChangeKind.Removed, path, None, is_dir))
+            elif mask & (IN_CLOSE_WRITE | IN_ATTRIB):
+                change = Change(ChangeKind.Modified, path, None, is_dir)
+                if not changes or changes[-1] != change: changes.append(change)
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF) and directory == self.Root:
+                changes.append(Change(ChangeKind.Removed, self.Root, None, True))
+
+        # the kernel queues both halves of a rename together, so a source without its destination left the tree.
+        for path, is_dir in moved_from.values():
+            changes.append(Change(ChangeKind.Removed, path, None, is_dir))
+            if is_dir: self._RemoveTree(path)
+
+        return changes
+
+    def __iter__(self) -> Iterator[Change]:
+        """ Yields changes until the watcher is closed, which may be done from another thread. """
+        while not self._closed: yield from self.Read()
+
+    def Close(self):
+        with self._lock:
+            if self._closed: return
+            self._closed = True
+            reading = self._reading
+
+        if reading: os.write(self._wake_write, b'\0')
+        else: self._finalizer()
+
+    @property
+    def Closed(self) -> bool: return self._closed
+    @property
+    def Count(self) -> int: return len(self._watches)
+
+    def __enter__(self): return self
+    def __exit__(self, *args): self.Close()
+    def __repr__(self): return f'<{self.__class__.__name__} Object. Root: {self.Root}, Watches: {len(self._watches)}>'
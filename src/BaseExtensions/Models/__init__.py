@@ -1,3 +1,12 @@
+from .Asynchronous import *
+from .Atomic import *
+from .Caching import *
+from .Codecs import *
+from .Copying import *
 from .Files import *
+from .Hashing import *
 from .Json import *
 from .Postitions import *
+from .Temporary import *
+from .Walking import *
+from .Watching import *
@@ -0,0 +1,266 @@
+import gc
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from enum import Enum
+from os.path import abspath
+from typing import List
+
+from BaseExtensions.FileLock import FileLock
+from BaseExtensions.Models import *
+
+
+
+
+def _Measure(name: str, factory: callable, count: int, unit: str = 'item', repeat: int = 5):
+    """ reports the fastest of several passes, then repeats one under tracemalloc to report the memory retained per item. """
+    elapsed = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            items = [factory(i) for i in range(count)]
+            elapsed = min(elapsed, time.perf_counter() - start)
+        finally: gc.enable()
+        del items
+    gc.collect()
+
+    tracemalloc.start()
+    items = [factory(i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+
+    print(f'{name:<32} {elapsed:8.3f} s  {current / count:8.1f} bytes/{unit}  ({count:,} {unit}s)')
+
+
+
+class _LegacyPath(os.PathLike):
+    """ The Path layout before __slots__: instance __dict__, finalizer on every instance and eager abspath. """
+    def __init__(self, _path: str, temporary_file: bool = False):
+        self._temporary_file = temporary_file
+        self._path = _path
+    def __del__(self):
+        if self._temporary_file and os.path.exists(self._path): os.remove(self._path)
+    def __fspath__(self): return self._path
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(self._path)
+            return self._hash
+
+    @classmethod
+    def FromString(cls, _path: str): return cls(abspath(_path))
+
+
+def PathConstruction(count: int = 1_000_000):
+    """ construction cost and memory per path, legacy layout vs the slot based Path. """
+    names = [f'folder{i % 1000}/file{i}.txt' for i in range(count)]
+    print('--- Path construction ---')
+    _Measure('legacy FromString', lambda i: _LegacyPath.FromString(names[i]), count, 'path')
+    _Measure('Path.FromString', lambda i: Path.FromString(names[i]), count, 'path')
+    _Measure('Path.FromString(lazy)', lambda i: Path.FromString(names[i], lazy=True), count, 'path')
+
+    # the same 1000 locations arriving as distinct string objects, as they do when read from a listing or a file.
+    print('--- repeated locations ---')
+    _Measure('legacy FromString', lambda i: _LegacyPath.FromString(f'/data/file{i % 1000}.txt'), count, 'path')
+    _Measure('Path.FromString(intern)', lambda i: Path.FromString(f'/data/file{i % 1000}.txt', intern=True), count, 'path')
+
+
+def Compression(records: int = 50_000):
+    """ size and save / read time of Path.SaveJson / ReadJson for each codec and compression level. """
+    data = [{ 'ID': i, 'Name': f'item {i}', 'Box': CropBox.Create(i, i * 2, 640, 480), 'Tags': ['a', 'b', str(i % 7)] } for i in range(records)]
+    with tempfile.TemporaryDirectory() as root:
+        raw = Path.Join(root, 'data.json')
+        start = time.perf_counter()
+        raw.SaveJson(data)
+        save = time.perf_counter() - start
+        start = time.perf_counter()
+        raw.ReadJson()
+        read = time.perf_counter() - start
+        baseline = raw.Size
+
+        print('--- Compression ---')
+        print(f'{"codec":<8} {"level":>5} {"bytes":>12} {"ratio":>7} {"save s":>8} {"read s":>8}')
+        print(f'{"raw":<8} {"-":>5} {baseline:12,} {1:7.2f} {save:8.3f} {read:8.3f}')
+        for codec in CODECS.values():
+            path = Path.Join(root, f'data.json{codec.Extensions[0]}')
+            for level in codec.Levels:
+                start = time.perf_counter()
+                path.SaveJson(data, level=level)
+                save = time.perf_counter() - start
+                start = time.perf_counter()
+                path.ReadJson()
+                read = time.perf_counter() - start
+                print(f'{codec.Name:<8} {level:5} {path.Size:12,} {baseline / path.Size:7.2f} {save:8.3f} {read:8.3f}')
+
+
+def _HandoffWaiter(path: str, backend: str, delay: float, rounds: int, holding, released_at, done, latencies):
+    lock = FileLock(path, backend=backend, delay=delay)
+    for i in range(rounds):
+        holding.wait()
+        holding.clear()
+        lock.acquire()
+        latencies[i] = time.monotonic_ns() - released_at.value
+        lock.release()
+        done.set()
+
+def FileLockHandoff(rounds: int = 20):
+    """ time from one process releasing a contended FileLock to the waiting process holding it, per backend. """
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    print('--- FileLock handoff latency ---')
+    print(f'{"backend":<20} {"p50 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+    with tempfile.TemporaryDirectory() as root:
+        for backend, delay in (('lockfile', 1), ('lockfile', 0.01), ('fcntl', 1)):
+            if backend == 'fcntl' and os.name != 'posix': continue
+            path = os.path.join(root, f'protected-{backend}')  # a path keeps one backend per process.
+
+            holding, done = context.Event(), context.Event()
+            released_at = context.Value('q', 0, lock=False)
+            latencies = context.Array('q', rounds, lock=False)
+            waiter = context.Process(target=_HandoffWaiter, args=(path, backend, delay, rounds, holding, released_at, done, latencies))
+            waiter.start()
+
+            lock = FileLock(path, backend=backend, delay=delay)
+            for _ in range(rounds):
+                lock.acquire()
+                holding.set()
+                time.sleep(random.uniform(0.02, 0.03))  # let the waiter block on the held lock; the jitter keeps releases out of phase with polling.
+                released_at.value = time.monotonic_ns()
+                lock.release()
+                done.wait()
+                done.clear()
+
+            waiter.join()
+            lock.purge()
+            ordered = sorted(latencies)
+            print(f'{f"{backend} delay={delay}":<20} {ordered[len(ordered) // 2] / 1e6:9.3f} {ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)] / 1e6:9.3f} {ordered[-1] / 1e6:9.3f}')
+
+
+class _Color(Enum):
+    Red = 'red'
+    Blue = 'blue'
+
+def _LegacySerialize(o):
+    """ the isinstance / hasattr chain serialize ran for every object before it cached a conversion per type. """
+    if isinstance(o, Enum): return o.value
+    if isinstance(o, BaseSetModel): return o.ToList()
+    if isinstance(o, BaseListModel): return o
+    if isinstance(o, BaseDictModel): return o.ToDict()
+    if hasattr(o, 'ToList') and callable(o.ToList): return o.ToList()
+    if hasattr(o, 'ToDict') and callable(o.ToDict): return o.ToDict()
+    return o
+
+def JsonEncoding(records: int = 20_000):
+    """ ToJsonString on a nested BaseListModel / BaseDictModel tree: the legacy dumps(indent=4, default=serialize) against JsonEncoder. """
+    tree = BaseListModel(BaseDictModel(ID=i, Name=f'item {i}', Color=_Color.Red if i % 2 else _Color.Blue, Tags=BaseSetModel({ 'a', str(i % 7) }),
+                                       Box=CropBox.Create(i, i * 2, 640, 480), Children=BaseListModel(BaseDictModel(Index=j, Color=_Color.Red, Size=Size.Create(j, j)) for j in range(5)))
+                         for i in range(records))
+
+    def _Time(name: str, func: callable, repeat: int = 3):
+        best = min(_Elapsed(func) for _ in range(repeat))
+        print(f'{name:<36} {best:8.3f} s')
+
+    def _Elapsed(func: callable) -> float:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    print('--- JSON encoding ---')
+    _Time('legacy dumps(indent=4)', lambda: json.dumps(tree, indent=4, default=_LegacySerialize))
+    _Time('legacy dumps(compact)', lambda: json.dumps(tree, separators=(',', ':'), default=_LegacySerialize))
+    _Time('ToJsonString()', lambda: tree.ToJsonString())
+    _Time('ToJsonString(compact=True)', lambda: tree.ToJsonString(compact=True))
+
+
+def JsonStreaming(records: int = 200_000):
+    """ peak memory of saving a large BaseListModel: ToJsonString then Write, against Path.SaveModel streaming WriteJson. times include tracemalloc overhead. """
+    tree = BaseListModel(BaseDictModel(ID=i, Name=f'item {i}', Box=CropBox.Create(i, i * 2, 640, 480)) for i in range(records))
+
+    def _Peak(name: str, func: callable):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{name:<28} {elapsed:8.3f} s   peak {peak / 1024 / 1024:8.1f} MB')
+
+    print('--- JSON streaming ---')
+    with tempfile.TemporaryDirectory() as root:
+        path = Path.Join(root, 'export.json')
+        _Peak('Write(ToJsonString())', lambda: path.Write(tree.ToJsonString(), atomic=True))
+        _Peak('SaveModel', lambda: path.SaveModel(tree))
+
+
+class _LegacyCropBox(BaseDictModel):
+    """ CropBox.Parse as it was before fields were declared: AssertKeys, then wrap the dict. """
+    @classmethod
+    def Parse(cls, d):
+        if isinstance(d, dict):
+            AssertKeys(d, 'Width', 'Height', 'X', 'Y')
+            return cls(d)
+
+        throw(d, dict)
+
+class _LegacyFrame(BaseDictModel):
+    @classmethod
+    def Parse(cls, d):
+        if isinstance(d, dict):
+            AssertKeys(d, 'ID', 'Name', 'Box', 'Points')
+            o = cls(d)
+            o['Box'] = _LegacyCropBox.Parse(o['Box'])
+            o['Points'] = [_LegacyCropBox.Parse(p) for p in o['Points']]
+            return o
+
+        throw(d, dict)
+
+class _Frame(BaseDictModel):
+    Fields = { 'ID': int, 'Name': str, 'Box': CropBox, 'Points': List[CropBox] }
+
+def ModelParsing(records: int = 200_000):
+    """ bulk FromJson into nested models: the AssertKeys Parse chain against the Parse generated from Fields. json.loads is timed once and excluded. """
+    data = json.dumps([{ 'ID': i, 'Name': f'item {i}', 'Box': CropBox.Create(i, i * 2, 640, 480), 'Points': [CropBox.Create(j, j, 1, 1) for j in range(3)] } for i in range(records)])
+
+    def _Time(name: str, func: callable, repeat: int = 3) -> float:
+        best = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()  # like timeit; collections triggered by the allocations would otherwise dominate.
+            try:
+                start = time.perf_counter()
+                func()
+                best = min(best, time.perf_counter() - start)
+            finally: gc.enable()
+        print(f'{name:<28} {best:8.3f} s')
+        return best
+
+    print('--- model parsing ---')
+    loads = _Time('json.loads', lambda: json.loads(data))
+    rows = json.loads(data)
+    legacy = _Time('AssertKeys Parse', lambda: [_LegacyFrame.Parse(row) for row in rows])
+    compiled = _Time('generated Parse', lambda: [_Frame.Parse(row) for row in rows])
+    print(f'parse speedup: {legacy / compiled:.2f}x, FromJson speedup: {(loads + legacy) / (loads + compiled):.2f}x')
+
+
+
+
+BENCHMARKS = {
+        'paths':       PathConstruction,
+        'compression': Compression,
+        'filelock':    FileLockHandoff,
+        'json':        JsonEncoding,
+        'streaming':   JsonStreaming,
+        'parsing':     ModelParsing,
+        }
+
+if __name__ == '__main__':
+    for _name in (sys.argv[1:] or BENCHMARKS):
+        BENCHMARKS[_name]()
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+from BaseExtensions.Models import AsyncFileExecutor, Path
+
+
+
+
+def test_executor_bounds_concurrent_operations():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def _work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock: active[0] -= 1
+
+    async def _main(executor): await asyncio.gather(*(executor.Run(_work) for _ in range(40)))
+
+    with AsyncFileExecutor(max_workers=8, max_concurrent=3) as executor: asyncio.run(_main(executor))
+    assert peak[0] == 3
+
+
+def test_cancelled_caller_keeps_its_slot_until_the_call_finishes():
+    started, finish = threading.Event(), threading.Event()
+
+    def _block():
+        started.set()
+        finish.wait(10)
+
+    async def _main(executor):
+        task = asyncio.ensure_future(executor.Run(_block))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+        second = asyncio.ensure_future(executor.Run(lambda: 'second'))
+        await asyncio.sleep(0.05)
+        assert not second.done()  # the blocked call still holds the only slot.
+        finish.set()
+        assert await second == 'second'
+
+    with AsyncFileExecutor(max_workers=2, max_concurrent=1) as executor: asyncio.run(_main(executor))
+
+
+def test_async_path_round_trip(tmp_path):
+    path = Path(str(tmp_path / 'data.json'))
+
+    async def _main(executor):
+        await path.AsyncSaveJson({ 'a': 1 }, executor=executor)
+        return await path.AsyncReadJson(executor=executor)
+
+    with AsyncFileExecutor(max_workers=2) as executor: assert asyncio.run(_main(executor)) == { 'a': 1 }
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from BaseExtensions.Models import AtomicWrite, GroupCommit, Path
+
+
+
+
+def test_atomic_write_replaces_or_leaves_untouched(tmp_path):
+    target = tmp_path / 'target.txt'
+    target.write_text('old')
+
+    with pytest.raises(RuntimeError):
+        with AtomicWrite(target, 'w') as f:
+            f.write('partial')
+            raise RuntimeError()
+    assert target.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['target.txt']  # the temporary file was removed.
+
+    with AtomicWrite(target, 'w') as f: f.write('new')
+    assert target.read_text() == 'new'
+
+
+def test_path_writers_atomic_and_grouped(tmp_path):
+    path = Path(str(tmp_path / 'data.json'))
+    path.SaveJson({ 'a': [1, 2] }, atomic=True)
+    assert path.ReadJson() == { 'a': [1, 2] }
+
+    with GroupCommit() as group:
+        for i in range(5): Path(str(tmp_path / f'{i}.txt')).Write(f'value {i}', group=group)
+        assert group.Pending == 5
+    assert group.Pending == 0
+    assert [Path(str(tmp_path / f'{i}.txt')).Read() for i in range(5)] == [f'value {i}' for i in range(5)]
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from BaseExtensions.Models import FileCache, Path
+
+
+
+
+def test_file_cache_read_only_values_are_frozen(tmp_path):
+    path = Path(str(tmp_path / 'data.json'))
+    path.SaveJson({ 'a': [1] })
+    cache = FileCache(copies='readonly')
+
+    value = path.ReadJson(cache=cache)  # just written, so inside the racy window and not cached.
+    with pytest.raises(TypeError): value['b'] = 2
+    assert value['a'] == (1,)
+
+
+def _Settle(path, seconds: int):
+    os.utime(path, ns=(seconds * 1_000_000_000, seconds * 1_000_000_000))  # outside the racy window, so reads are cached.
+
+
+def test_file_cache_hits_and_reloads_changed_files(tmp_path):
+    path = Path(str(tmp_path / 'data.json'))
+    path.SaveJson({ 'a': [1] })
+    _Settle(path, 1)
+    cache = FileCache()
+
+    first = path.ReadJson(cache=cache)
+    second = path.ReadJson(cache=cache)
+    assert first == second == { 'a': [1] } and first is not second  # deep copies by default.
+    assert (cache.Hits, cache.Misses) == (1, 1)
+
+    path.SaveJson({ 'a': [2] })
+    _Settle(path, 2)
+    assert path.ReadJson(cache=cache) == { 'a': [2] }
+    assert cache.Misses == 2
+
+
+def test_file_cache_evicts_least_recently_used(tmp_path):
+    paths = [Path(str(tmp_path / f'{i}.json')) for i in range(3)]
+    for path in paths:
+        path.SaveJson(list(range(100)))
+        _Settle(path, 1)
+
+    cache = FileCache(max_bytes=2 * os.path.getsize(paths[0]), weight='file')
+    for path in paths: path.ReadJson(cache=cache)
+    assert cache.Count == 2 and cache.Evictions == 1
+
+    paths[2].ReadJson(cache=cache)
+    assert cache.Hits == 1
+    cache.Invalidate(paths[2])
+    assert cache.Count == 1
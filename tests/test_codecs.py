@@ -0,0 +1,30 @@
+import pickle
+
+import pytest
+
+from BaseExtensions.Models import Path
+
+
+
+
+@pytest.mark.parametrize('name', ['data.json', 'data.json.gz', 'data.json.bz2', 'data.json.xz'])
+def test_json_codec_round_trip(tmp_path, name):
+    path = Path(str(tmp_path / name))
+    data = { 'items': list(range(1000)), 'name': 'é' }
+    path.SaveJson(data)
+    assert path.ReadJson() == data
+
+
+@pytest.mark.parametrize('name', ['data.pkl.gz', 'data.pkl.bz2', 'data.pkl.xz'])
+def test_corrupt_compressed_file_returns_default(tmp_path, name):
+    path = Path(str(tmp_path / name))
+    path.SavePickle({ 'a': 1 })
+    assert path.GetFileData(pickle) == { 'a': 1 }
+
+    with open(path, 'r+b') as f:
+        header = f.read(10)
+        f.seek(0)
+        f.truncate()
+        f.write(header + b'corrupt' * 50)
+
+    assert path.GetFileData(pickle, Default='default') == 'default'
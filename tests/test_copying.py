@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from BaseExtensions.Models import CopyFile, Path
+
+
+
+
+def test_copy_file_round_trip(tmp_path):
+    data = os.urandom((1 << 20) + 123)
+    (tmp_path / 'src.bin').write_bytes(data)
+
+    assert CopyFile(tmp_path / 'src.bin', tmp_path / 'dst.bin') == len(data)
+    assert (tmp_path / 'dst.bin').read_bytes() == data
+
+
+def test_copy_tree_round_trip(tmp_path):
+    source = tmp_path / 'src'
+    files = { 'a.txt': b'a', 'sub/b.bin': os.urandom(5000), 'sub/deeper/c.bin': b'' }
+    for name, data in files.items():
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_bytes(data)
+
+    Path.CopyTree(str(source), str(tmp_path / 'dst'), workers=2)
+    for name, data in files.items(): assert (tmp_path / 'dst' / name).read_bytes() == data
+
+    with pytest.raises(FileExistsError): Path.CopyTree(str(source), str(tmp_path / 'dst'))
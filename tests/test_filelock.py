@@ -0,0 +1,421 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from BaseExtensions import FileLock as FileLockModule
+from BaseExtensions.FileLock import AsyncFileLock, BACKENDS, Backoff, FileLock, FileLockException, FileLockSet, GetLockMetrics, Histogram, IsStale, ReadOwner
+
+
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request): return request.param
+
+
+def _Hold(path: str, backend: str, holding, release):
+    lock = FileLock(path, backend=backend)
+    with lock:
+        holding.set()
+        release.wait(10)
+
+
+@pytest.fixture
+def other_process():
+    """ starts a process that holds a lock until the test ends. """
+    context = multiprocessing.get_context('fork')
+    processes = []
+
+    def _start(path: str, backend: str):
+        holding, release = context.Event(), context.Event()
+        process = context.Process(target=_Hold, args=(path, backend, holding, release))
+        process.start()
+        assert holding.wait(10)
+        processes.append((process, release))
+        return release
+
+    yield _start
+    for process, release in processes:
+        release.set()
+        process.join(10)
+
+
+def test_threads_are_mutually_exclusive(tmp_path, backend):
+    path = str(tmp_path / 'protected')
+    counter = [0]
+
+    def _work():
+        lock = FileLock(path, backend=backend, timeout=30, delay=0.01)
+        for _ in range(100):
+            with lock:
+                value = counter[0]
+                time.sleep(0)
+                counter[0] = value + 1
+
+    threads = [threading.Thread(target=_work) for _ in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    assert counter[0] == 800
+    assert FileLock(path, backend=backend).available()
+    assert GetLockMetrics(path).Acquisitions >= 800
+
+
+def test_other_process_contention_and_timeout(tmp_path, backend, other_process):
+    path = str(tmp_path / 'protected')
+    release = other_process(path, backend)
+
+    lock = FileLock(path, backend=backend, delay=0.01)
+    assert not lock.acquire(blocking=False)
+
+    start = time.monotonic()
+    with pytest.raises(FileLockException): lock.acquire(timeout=0.2)
+    assert 0.15 < time.monotonic() - start < 5
+
+    release.set()
+    assert lock.acquire(timeout=10)
+    lock.release()
+
+
+def test_default_backend_is_the_lock_file(tmp_path):
+    assert FileLock(str(tmp_path / 'protected')).backend == 'lockfile'
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='counts descriptors through /proc')
+def test_timed_flock_waits_do_not_leak_threads(tmp_path, other_process):
+    path = str(tmp_path / 'protected')
+    other_process(path, 'fcntl')
+
+    lock = FileLock(path, backend='fcntl', delay=0.01)
+    threads, descriptors = threading.active_count(), len(os.listdir('/proc/self/fd'))
+    for _ in range(20):
+        with pytest.raises(FileLockException): lock.acquire(timeout=0.01)
+    assert threading.active_count() == threads
+    assert len(os.listdir('/proc/self/fd')) == descriptors
+
+
+def test_shared_readers_exclude_writer(tmp_path):
+    if 'fcntl' not in BACKENDS: pytest.skip('shared locks need fcntl')
+    path = str(tmp_path / 'protected')
+    reader = FileLock(path, backend='fcntl', shared=True)
+    other = threading.Thread(target=lambda: results.append(FileLock(path, backend='fcntl').acquire(blocking=False)))
+    results = []
+    with reader:
+        assert FileLock(path, backend='fcntl').available(shared=True)
+        other.start()
+        other.join()
+    assert results == [False]
+
+
+def _Write(path: str, start):
+    start.wait(10)
+    with FileLock(path, backend='fcntl', writer_preference=True, timeout=10): pass
+
+def _TryRead(path: str, start):
+    start.wait(10)
+    os._exit(0 if FileLock(path, backend='fcntl', shared=True, writer_preference=True).acquire(blocking=False) else 1)
+
+
+def test_writer_preference_queues_new_readers(tmp_path):
+    if 'fcntl' not in BACKENDS: pytest.skip('shared locks need fcntl')
+    path = str(tmp_path / 'protected')
+    context = multiprocessing.get_context('fork')
+
+    # forked before the reader locks, so none of them inherits its descriptor.
+    events = [context.Event() for _ in range(3)]
+    early, writer, late = [context.Process(target=target, args=(path, start)) for target, start in zip((_TryRead, _Write, _TryRead), events)]
+    for process in (early, writer, late): process.start()
+
+    with FileLock(path, backend='fcntl', shared=True, writer_preference=True):
+        events[0].set()
+        early.join(10)
+        assert early.exitcode == 0  # readers share the lock.
+
+        events[1].set()
+        time.sleep(0.3)  # the writer now holds the gate while it waits for this reader.
+        events[2].set()
+        late.join(10)
+        assert late.exitcode == 1
+
+    writer.join(10)
+    assert writer.exitcode == 0
+
+
+def test_reentrant_per_thread(tmp_path, backend):
+    lock = FileLock(str(tmp_path / 'protected'), backend=backend)
+    with lock:
+        with FileLock(str(tmp_path / 'protected'), backend=backend, timeout=0.1): assert lock.locked()
+    assert not lock.locked() and lock.available()
+
+
+def test_conflicting_backend_is_rejected(tmp_path):
+    if len(BACKENDS) < 2: pytest.skip('only one backend on this platform')
+    path = str(tmp_path / 'protected')
+    kept = FileLock(path, backend='fcntl')
+    with pytest.raises(ValueError): FileLock(path, backend='lockfile')
+    del kept
+
+
+def _Child(lock, done):
+    held = lock.locked()
+    done.wait(10)
+    os._exit(1 if held else 0)
+
+
+def test_forked_child_does_not_keep_the_lock(tmp_path, backend):
+    path = str(tmp_path / 'protected')
+    context = multiprocessing.get_context('fork')
+    done = context.Event()
+    lock = FileLock(path, backend=backend)
+    with lock:
+        child = context.Process(target=_Child, args=(lock, done))
+        child.start()
+        time.sleep(0.1)
+
+    try: assert FileLock(path, backend=backend).acquire(timeout=2)  # the child's copy of the descriptor no longer holds it.
+    finally:
+        done.set()
+        child.join(10)
+    assert child.exitcode == 0
+
+
+def _StaleRecord(**changes) -> bytes:
+    record = dict(pid=os.getpid(), host=socket.gethostname(), boot_id=None, token='dead', acquired=time.time(), expires=None, note=None)
+    record.update(changes)
+    return json.dumps(record).encode()
+
+
+def test_stale_lock_of_dead_process_is_broken(tmp_path):
+    path = str(tmp_path / 'protected')
+    process = multiprocessing.get_context('fork').Process(target=os._exit, args=(0,))
+    process.start()
+    process.join()
+
+    with open(path + '.lock', 'wb') as f: f.write(_StaleRecord(pid=process.pid))
+
+    lock = FileLock(path, backend='lockfile', delay=0.01, timeout=5)
+    with lock: assert ReadOwner(lock.lockfile)['pid'] == os.getpid()
+    assert not os.path.exists(path + '.lock')
+    assert not os.path.exists(path + '.lock.break')
+
+
+def test_expired_lease_is_broken_and_live_holder_is_not(tmp_path):
+    expired = str(tmp_path / 'expired')
+    with open(expired + '.lock', 'wb') as f: f.write(_StaleRecord(expires=time.time() - 1))
+    with FileLock(expired, backend='lockfile', delay=0.01, timeout=5): pass
+
+    live = str(tmp_path / 'live')
+    with open(live + '.lock', 'wb') as f: f.write(_StaleRecord(pid=os.getppid()))
+    with pytest.raises(FileLockException): FileLock(live, backend='lockfile', delay=0.01, timeout=0.2).acquire()
+
+
+def test_renew_extends_the_lease(tmp_path, backend):
+    lock = FileLock(str(tmp_path / 'protected'), backend=backend, lease=60)
+    with pytest.raises(FileLockException): lock.renew()
+    with lock:
+        first = lock.owner()
+        time.sleep(0.01)
+        lock.renew()
+        second = lock.owner()
+    assert second['token'] == first['token'] and second['expires'] > first['expires']
+
+
+def test_heartbeat_keeps_a_short_lease_alive(tmp_path):
+    path = str(tmp_path / 'protected')
+    with FileLock(path, backend='lockfile', lease=0.3, heartbeat=0.05):
+        time.sleep(0.6)
+        assert not IsStale(ReadOwner(path + '.lock'))
+
+
+def test_lost_lease_cannot_be_renewed(tmp_path):
+    path = str(tmp_path / 'protected')
+    lock = FileLock(path, backend='lockfile', lease=0.1)
+    lock.acquire()
+    time.sleep(0.2)
+    with open(path + '.lock', 'wb') as f: f.write(_StaleRecord(pid=os.getppid()))  # a waiter broke the expired lease and took the lock.
+    with pytest.raises(FileLockException): lock.renew()
+    lock.release()
+    assert ReadOwner(path + '.lock')['pid'] == os.getppid()  # the new holder's lock file is left alone.
+
+
+def test_async_lock(tmp_path, backend):
+    path = str(tmp_path / 'protected')
+    order = []
+
+    async def _task(name: str):
+        async with AsyncFileLock(path, backend=backend, delay=0.01, timeout=10):
+            order.append(f'{name} in')
+            await asyncio.sleep(0.01)
+            order.append(f'{name} out')
+
+    async def _main(): await asyncio.gather(*(_task(str(i)) for i in range(5)))
+
+    asyncio.run(_main())
+    assert len(order) == 10
+    assert all(order[i].split()[0] == order[i + 1].split()[0] for i in range(0, 10, 2))
+
+
+def test_async_waiters_do_not_occupy_threads(tmp_path, backend):
+    path = str(tmp_path / 'protected')
+    holder = FileLock(path, backend=backend)
+
+    async def _wait():
+        with pytest.raises(FileLockException): await AsyncFileLock(path, backend=backend, timeout=0.3).acquire()
+
+    async def _main():
+        start = time.monotonic()
+        await asyncio.gather(*(_wait() for _ in range(100)))
+        return time.monotonic() - start
+
+    with holder:
+        threads = threading.active_count()
+        assert asyncio.run(_main()) < 0.6  # every timeout starts right away, not once a pool thread frees up.
+        assert threading.active_count() <= threads + 64
+
+
+def test_many_waiting_tasks_cannot_starve_the_holder(tmp_path, backend, other_process):
+    first, second = str(tmp_path / 'first'), str(tmp_path / 'second')
+    release = other_process(second, backend)
+
+    async def _hold():
+        async with AsyncFileLock(first, backend=backend):
+            await asyncio.sleep(0.1)  # the waiters are queued by now.
+            async with AsyncFileLock(second, backend=backend, delay=0.01, timeout=10): return 'held'
+
+    async def _wait():
+        async with AsyncFileLock(first, backend=backend, timeout=None): pass
+
+    async def _main():
+        holder = asyncio.ensure_future(_hold())
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.ensure_future(_wait()) for _ in range(100)]
+        await asyncio.sleep(0.3)
+        release.set()
+        result = await asyncio.wait_for(holder, 10)
+        await asyncio.wait_for(asyncio.gather(*waiters), 10)
+        return result
+
+    assert asyncio.run(_main()) == 'held'
+
+
+def test_async_lock_against_another_process(tmp_path, backend, other_process):
+    path = str(tmp_path / 'protected')
+    release = other_process(path, backend)
+    lock = AsyncFileLock(path, backend=backend, delay=0.01)
+
+    async def _main():
+        assert not await lock.acquire(blocking=False)
+        start = time.monotonic()
+        with pytest.raises(FileLockException): await lock.acquire(timeout=0.2)
+        assert 0.15 < time.monotonic() - start < 5
+
+        release.set()
+        assert await lock.acquire(timeout=10)
+        lock.release()
+
+    asyncio.run(_main())
+    assert FileLock(path, backend=backend).available()
+
+
+def test_cancelled_async_waiter_leaves_the_lock_usable(tmp_path, backend):
+    path = str(tmp_path / 'protected')
+
+    async def _main():
+        holder = AsyncFileLock(path, backend=backend)
+        await holder.acquire()
+        waiter = asyncio.ensure_future(AsyncFileLock(path, backend=backend).acquire())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError): await waiter
+        holder.release()
+
+        async with AsyncFileLock(path, backend=backend, timeout=1): pass
+
+    asyncio.run(_main())
+    assert FileLock(path, backend=backend).available()
+
+
+def test_backoff_spins_then_grows_to_its_maximum():
+    delays = Backoff(spins=2, initial=0.01, maximum=0.05, factor=2, jitter=0).Delays()
+    assert [next(delays) for _ in range(7)] == [0, 0, 0.01, 0.02, 0.04, 0.05, 0.05]
+
+    jittered = Backoff(spins=0, initial=1, maximum=1, jitter=0.5).Delays()
+    assert all(0.5 <= next(jittered) <= 1 for _ in range(100))
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for _ in range(90): histogram.Add(0.000_010)
+    for _ in range(10): histogram.Add(0.5)
+
+    assert histogram.Count == 100 and histogram.Max == 0.5
+    assert 0.000_010 <= histogram.Percentile(50) <= 0.000_020
+    assert histogram.Percentile(99) == 0.5
+    assert histogram.Mean == pytest.approx((90 * 0.000_010 + 10 * 0.5) / 100)
+
+
+def test_metrics_survive_their_locks_and_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(FileLockModule, 'RETAINED_METRICS', 10)
+    path = str(tmp_path / 'protected')
+    with FileLock(path): pass
+    with FileLock(path): pass
+    assert GetLockMetrics(path).Acquisitions == 2  # kept while no FileLock uses the path.
+
+    for i in range(50):
+        with FileLock(str(tmp_path / f'{i}')): pass
+
+    kept = [key for key in GetLockMetrics() if key.startswith(str(tmp_path))]
+    assert len(kept) == 10 and GetLockMetrics(path) is None
+    assert GetLockMetrics(str(tmp_path / '49')).Acquisitions == 1
+
+
+def test_lock_set_is_all_or_nothing(tmp_path, backend):
+    paths = [str(tmp_path / name) for name in ('b', 'a', 'c')]
+    holder = FileLock(paths[2], backend=backend)
+    held = threading.Event()
+    release = threading.Event()
+
+    def _hold():
+        with holder:
+            held.set()
+            release.wait(10)
+
+    thread = threading.Thread(target=_hold)
+    thread.start()
+    held.wait(10)
+
+    locks = FileLockSet(paths + [paths[0]], backend=backend, delay=0.01)
+    assert len(locks) == 3
+    assert not locks.acquire(blocking=False)
+    assert all(FileLock(path, backend=backend).available() for path in paths[:2])
+    with pytest.raises(FileLockException): locks.acquire(timeout=0.1)
+
+    release.set()
+    thread.join()
+    assert locks.acquire(timeout=None)
+    assert locks.locked()
+    locks.release()
+    assert not locks.locked()
+
+    empty = FileLockSet([])
+    assert empty.acquire() and empty.locked()
+
+
+def test_lock_sets_overlapping_in_any_order_do_not_deadlock(tmp_path, backend):
+    names = [str(tmp_path / name) for name in 'abcd']
+    counter = [0]
+
+    def _work(paths):
+        for _ in range(50):
+            with FileLockSet(paths, backend=backend, delay=0.001, timeout=30):
+                counter[0] += 1
+
+    threads = [threading.Thread(target=_work, args=(order,)) for order in (names, names[::-1], names[1:] + names[:1], names[2:])]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join(60)
+    assert counter[0] == 200
@@ -0,0 +1,59 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+from BaseExtensions.Models import DigestCache, HashFile, Path
+
+
+
+
+def _Digest(data: bytes, algorithm: str) -> str: return base64.urlsafe_b64encode(hashlib.new(algorithm, data).digest()).decode()
+
+
+@pytest.mark.parametrize('size', [0, 1, 65536 + 7, (1 << 20) + 3])  # empty, buffered reads, and the mmap path.
+@pytest.mark.parametrize('algorithm', ['sha1', 'sha256', 'blake2b'])
+def test_hash_file_matches_hashlib(tmp_path, size, algorithm):
+    data = os.urandom(size)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(data)
+
+    assert HashFile(path, algorithm) == _Digest(data, algorithm)
+    assert Path(str(path)).GetHashID(algorithm=algorithm) == _Digest(data, algorithm)
+
+
+def test_hash_many_walks_directories(tmp_path):
+    expected = { }
+    for i in range(20):
+        folder = tmp_path / f'd{i % 3}'
+        folder.mkdir(exist_ok=True)
+        data = os.urandom(1000 + i)
+        (folder / f'{i}.bin').write_bytes(data)
+        expected[str(folder / f'{i}.bin')] = _Digest(data, 'sha256')
+
+    results = { str(path): digest for path, digest in Path.HashMany([str(tmp_path)], 'sha256', workers=4) }
+    assert results == expected
+
+
+def test_hash_many_return_exceptions(tmp_path):
+    missing = str(tmp_path / 'missing.bin')
+    (path, error), = Path.HashMany([missing], return_exceptions=True)
+    assert str(path) == missing and isinstance(error, FileNotFoundError)
+
+    with pytest.raises(FileNotFoundError): list(Path.HashMany([missing]))
+
+
+def test_digest_cache_hits_and_detects_changes(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'first')
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))  # outside the racy window, so it is cached.
+
+    with DigestCache(tmp_path / 'digests.db') as cache:
+        assert cache.Get(path) == _Digest(b'first', 'sha1')
+        assert cache.Get(path) == _Digest(b'first', 'sha1')
+        assert (cache.Hits, cache.Misses) == (1, 1)
+
+        path.write_bytes(b'second!')
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        assert cache.Get(path) == _Digest(b'second!', 'sha1')
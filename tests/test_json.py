@@ -0,0 +1,140 @@
+import io
+import json
+from enum import Enum
+from typing import List
+
+import pytest
+
+from BaseExtensions.Models import BaseDictModel, BaseListModel, BaseSetModel, CropBox, JsonEncoder, Path, Point, Size, ValidationError
+
+
+
+
+class _Color(Enum):
+    Red = 'red'
+
+
+class _Frame(BaseDictModel):
+    Fields = { 'ID': int, 'Box': CropBox, 'Points': List[Point], 'Tags': List[str], 'Note': None }
+
+
+def _Raw(**changes):
+    raw = { 'ID': 1, 'Box': { 'X': 1, 'Y': 2, 'Width': 3, 'Height': 4 }, 'Points': [{ 'X': 5, 'Y': 6 }], 'Tags': ['a'], 'Note': None }
+    raw.update(changes)
+    return raw
+
+
+def test_parse_builds_nested_models():
+    frame = _Frame.FromJson(json.dumps(_Raw()))
+    assert type(frame) is _Frame
+    assert type(frame['Box']) is CropBox and frame['Box'].ToTuple() == (1, 2, 3, 4)
+    assert type(frame['Points'][0]) is Point and frame['Points'][0].ToTuple() == (5, 6)
+
+
+def test_parse_accepts_list_subclasses():
+    frame = _Frame.Parse(_Raw(Points=BaseListModel([{ 'X': 1, 'Y': 2 }]), Tags=BaseListModel(['a'])))
+    assert type(frame['Points'][0]) is Point
+
+
+def test_parse_reports_every_error():
+    with pytest.raises(ValidationError) as info:
+        _Frame.Parse(_Raw(ID='1', Box={ 'X': 1 }, Points=[{ 'X': 1 }, 3], Tags=[1]))
+
+    assert info.value.errors == [
+            ('ID', 'expected int, got str'),
+            ('Box.Y', 'missing'), ('Box.Width', 'missing'), ('Box.Height', 'missing'),
+            ('Points[0].Y', 'missing'),
+            ('Points[1]', "Expecting <class 'dict'>   got type <class 'int'>"),
+            ('Tags[0]', 'expected str, got int'),
+            ]
+    assert isinstance(info.value, KeyError) and isinstance(info.value, TypeError)
+
+
+def test_missing_field():
+    raw = _Raw()
+    del raw['Note']
+    with pytest.raises(ValidationError) as info: _Frame.Parse(raw)
+    assert info.value.errors == [('Note', 'missing')]
+
+
+def test_positions_keep_baseline_parse():
+    assert Point.Parse(None) is None and Size.Parse(None) is None
+    with pytest.raises(TypeError): CropBox.Parse(None)
+    with pytest.raises(KeyError): Point.Parse({ 'X': 1 })
+    assert CropBox.Parse({ 'X': '1', 'Y': 2, 'Width': 3, 'Height': 4 })['X'] == '1'
+
+
+def test_hand_written_parse_is_kept():
+    class _Custom(BaseDictModel):
+        Fields = { 'a': int }
+        @classmethod
+        def Parse(cls, d): return 'custom'
+
+    class _Child(_Custom): pass
+
+    assert _Child.Parse({ }) == 'custom'
+
+
+def test_disagreeing_paths_raise():
+    calls = []
+
+    class _Flaky(BaseDictModel):
+        @classmethod
+        def Parse(cls, d):
+            calls.append(d)
+            if len(calls) == 1: raise TypeError('first call only')
+            return cls(d)
+
+    class _Outer(BaseDictModel):
+        Fields = { 'Inner': _Flaky }
+
+    with pytest.raises(RuntimeError): _Outer.Parse({ 'Inner': { } })
+
+
+def test_json_string_matches_json_dumps():
+    model = BaseDictModel(a=_Color.Red, s=BaseSetModel({ 1 }), n=BaseListModel([Size.Create(1, 2)]))
+    expected = { 'a': 'red', 's': [1], 'n': [{ 'Width': 1, 'Height': 2 }] }
+    assert json.loads(model.ToJsonString()) == expected
+    assert model.ToJsonString(compact=True) == json.dumps(expected, separators=(',', ':'))
+    assert model.ToDict() == expected
+
+    with pytest.raises(TypeError): BaseDictModel(o=object()).ToJsonString()
+
+
+def test_encoder_register():
+    class _Custom(object): pass
+
+    JsonEncoder.Register(_Custom, lambda o: 'custom')
+    assert BaseListModel([_Custom()]).ToJsonString(compact=True) == '["custom"]'
+
+    class _Model(BaseDictModel): pass
+    for native in (_Model, BaseListModel, bool):  # json would never call the conversion.
+        with pytest.raises(TypeError): JsonEncoder.Register(native, lambda o: 'native')
+
+
+@pytest.mark.parametrize('stream', [io.StringIO, io.BytesIO])
+def test_write_json_matches_to_json_string(stream):
+    model = BaseListModel(BaseDictModel(ID=i, Box=CropBox.Create(i, i, 1, 1)) for i in range(500))
+    f = stream()
+    model.WriteJson(f, chunk_size=100)
+    value = f.getvalue()
+    assert (value.decode() if isinstance(value, bytes) else value) == model.ToJsonString()
+
+
+def test_write_json_detects_text_writers():
+    class _TextWriter(object):
+        encoding = 'utf-8'
+        def __init__(self): self.parts = []
+        def write(self, part): self.parts.append(part)
+
+    writer = _TextWriter()
+    BaseListModel([1]).WriteJson(writer, compact=True)
+    assert writer.parts == ['[1]']
+
+
+def test_save_model(tmp_path):
+    model = BaseListModel(BaseDictModel(ID=i) for i in range(100))
+    for name in ('data.json', 'data.json.gz'):
+        path = Path(str(tmp_path / name))
+        path.SaveModel(model, compact=True)
+        assert path.ReadJson() == model
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from BaseExtensions.Models import Path
+
+
+
+
+@pytest.mark.parametrize('name', ['data.pkl', 'data.pkl.gz'])
+def test_out_of_band_pickle_round_trip(tmp_path, name):
+    path = Path(str(tmp_path / name))
+    blob = os.urandom(200_000)
+    data = { 'blob': blob, 'array': bytearray(blob), 'small': b'x', 'shared': [blob, blob] }
+
+    path.SavePickle(data, out_of_band=True)
+    path.SavePickle(data, out_of_band=True)  # the second save removes the first sidecar.
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.buffers')]) == 1
+
+    loaded = path.ReadPickle()
+    assert loaded == data
+    assert loaded['shared'][0] is loaded['shared'][1]
+
+    views = path.ReadPickle(buffer_views=True)
+    assert isinstance(views['blob'], memoryview) and bytes(views['blob']) == blob
+
+    path.SavePickle({ 'plain': True })
+    assert path.ReadPickle() == { 'plain': True }
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.buffers')]
+
+
+def test_out_of_band_save_does_not_unpickle_previous_contents(tmp_path):
+    class _Exploding(object):
+        def __reduce__(self): return (exec, ('raise SystemExit("unpickled")',))
+
+    path = Path(str(tmp_path / 'data.pkl'))
+    path.SavePickle(_Exploding())
+    path.SavePickle({ 'a': 1 }, out_of_band=True)
+    assert path.ReadPickle() == { 'a': 1 }
@@ -0,0 +1,91 @@
+import gc
+import mmap
+import os
+import sys
+
+import pytest
+
+from BaseExtensions.Models import CropBox, Path
+
+
+
+
+def test_path_is_slot_based_and_path_like(tmp_path):
+    path = Path.FromString(str(tmp_path / 'a.txt'))
+    assert not hasattr(path, '__dict__')
+    assert os.fspath(path) == str(tmp_path / 'a.txt')
+    assert path == Path(str(tmp_path / 'a.txt')) and hash(path) == hash(str(tmp_path / 'a.txt'))
+
+
+def test_lazy_path_absolutizes_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = Path.FromString('a.txt', lazy=True)
+    monkeypatch.chdir(tmp_path.parent)
+    assert str(path) == str(tmp_path.parent / 'a.txt')  # the working directory at first use.
+    assert str(Path.FromString('/abs/a.txt', lazy=True)) == '/abs/a.txt'
+
+
+def test_interned_paths_share_one_string():
+    first = Path.FromString(''.join(['/data/', 'a.txt']), intern=True)
+    second = Path.FromString(''.join(['/data/', 'a.txt']), intern=True)
+    assert str(first) is str(second) is sys.intern('/data/a.txt')
+
+
+def test_temporary_file_is_removed_with_its_path(tmp_path):
+    name = str(tmp_path / 'temp.txt')
+    open(name, 'w').close()
+    Path(name)
+    gc.collect()
+    assert os.path.exists(name)
+
+    path = Path(name, temporary_file=True)
+    del path
+    gc.collect()
+    assert not os.path.exists(name)
+
+
+def test_read_returns_the_data(tmp_path):
+    path = Path(str(tmp_path / 'data.bin'))
+    data = os.urandom(100_000)
+    path.Write(data)
+    assert path.Read(open_as_binary=True) == data
+
+
+def test_read_into_fills_a_buffer(tmp_path):
+    path = Path(str(tmp_path / 'data.bin'))
+    data = os.urandom(10_000)
+    path.Write(data)
+
+    buffer = bytearray(4000)
+    assert path.ReadInto(buffer, offset=7000) == 3000
+    assert buffer[:3000] == data[7000:]
+    assert path.ReadInto(memoryview(buffer)[:100]) == 100 and buffer[:100] == data[:100]
+
+
+def test_memory_map_views_a_range(tmp_path):
+    path = Path(str(tmp_path / 'data.bin'))
+    data = os.urandom(3 * mmap.ALLOCATIONGRANULARITY)
+    path.Write(data)
+
+    offset = mmap.ALLOCATIONGRANULARITY + 5  # not aligned, so the mapping starts below it.
+    with path.MemoryMap(offset, 100) as view: assert bytes(view) == data[offset:offset + 100]
+    with path.MemoryMap(len(data) - 10) as view: assert bytes(view) == data[-10:]
+    with path.MemoryMap(len(data) + 10) as view: assert len(view) == 0
+
+    with path.MemoryMap(10, 4, writable=True) as view: view[:] = b'abcd'
+    assert path.Read(open_as_binary=True)[10:14] == b'abcd'
+
+
+def test_json_lines_round_trip(tmp_path):
+    path = Path(str(tmp_path / 'data.jsonl'))
+    assert path.AppendJsonLines(({ 'ID': i } for i in range(25)), flush_every=10) == 25
+    with open(path, 'a') as f: f.write('\n')
+    assert path.AppendJsonLines([{ 'ID': 25 }]) == 1
+    assert list(path.IterJsonLines()) == [{ 'ID': i } for i in range(26)]
+
+    boxes = Path(str(tmp_path / 'boxes.jsonl'))
+    boxes.AppendJsonLines([CropBox.Create(1, 2, 3, 4)])
+    box, = boxes.IterJsonLines(CropBox)
+    assert type(box) is CropBox and box.ToTuple() == (1, 2, 3, 4)
+
+    with pytest.raises(ValueError): path.AppendJsonLines([1], indent=4)
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from BaseExtensions.Models import Path
+
+
+
+
+def test_stat_many_keeps_input_order(tmp_path):
+    names = [str(tmp_path / f'{i}.txt') for i in range(50)]
+    for name in names[::2]: open(name, 'w').close()
+
+    results = list(Path.StatMany(iter(names), workers=4))
+    assert [str(path) for path, _ in results] == names
+    assert [stat.Exists for _, stat in results] == [i % 2 == 0 for i in range(50)]
+
+
+def test_stat_ttl_answers_from_one_snapshot(tmp_path):
+    name = str(tmp_path / 'data.txt')
+    with open(name, 'w') as f: f.write('abc')
+
+    path = Path(name, stat_ttl=60)
+    assert path.Exists and path.IsFile and path.Size == 3
+    os.remove(name)
+    assert path.Exists  # still the cached snapshot.
+    assert not path.Refresh().Exists and not path.Exists
+
+
+def test_file_stat_of_a_broken_link(tmp_path):
+    os.symlink(str(tmp_path / 'missing'), str(tmp_path / 'link'))
+    stat = Path(str(tmp_path / 'link')).Stat()
+    assert stat.IsLink and not stat.Exists
+    with pytest.raises(FileNotFoundError): stat.Size
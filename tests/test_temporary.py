@@ -0,0 +1,46 @@
+import gc
+import os
+
+from BaseExtensions.Models import TempArena
+
+
+
+
+def test_arena_removes_its_files_together(tmp_path):
+    outside = tmp_path / 'outside.txt'
+    outside.write_text('x')
+
+    with TempArena(str(tmp_path / 'root'), prefer_memory=False) as arena:
+        first = arena.CreateFile('a.txt')
+        second = arena.CreateFile('b.txt', 'sub', 'deeper')
+        first.Write('a')
+        second.Write('b')
+        arena.Track(str(outside))
+        assert os.path.dirname(str(first)) == os.path.dirname(os.path.dirname(os.path.dirname(str(second))))
+
+    assert not first.Exists and not second.Exists and not outside.exists()
+    assert os.listdir(tmp_path / 'root') == []
+
+    path = arena.CreateFile('again.txt')  # still usable after Cleanup.
+    path.Write('c')
+    arena.Cleanup()
+    assert not path.Exists
+
+
+def test_small_files_are_kept_in_memory(tmp_path):
+    arena = TempArena(str(tmp_path), memory_limit=100)
+    small, large = arena.CreateFile('small.bin', size_hint=10), arena.CreateFile('large.bin', size_hint=1000)
+    assert str(large).startswith(str(tmp_path))
+    if arena._prefer_memory: assert str(small).startswith('/dev/shm/')
+
+    small.Write(b'x')
+    del arena
+    gc.collect()
+    assert not small.Exists  # removed by the finalizer.
+
+
+def test_memory_file_has_no_path():
+    with TempArena.MemoryFile() as f:
+        f.write(b'data')
+        f.seek(0)
+        assert f.read() == b'data'
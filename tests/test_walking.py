@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from BaseExtensions.Models import Path
+
+
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in ('a.txt', 'b.log', 'sub/c.txt', 'sub/deeper/d.txt', 'skip/e.txt'):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(name.encode())
+    return tmp_path
+
+
+def _Names(root, entries) -> set: return { os.path.relpath(entry.path if isinstance(entry, os.DirEntry) else str(entry), root) for entry in entries }
+
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_scan_filters(tree, workers):
+    assert _Names(tree, Path.Scan(str(tree), workers=workers)) == { 'a.txt', 'b.log', 'sub/c.txt', 'sub/deeper/d.txt', 'skip/e.txt' }
+    assert _Names(tree, Path.Scan(str(tree), include='*.txt', exclude='skip', workers=workers)) == { 'a.txt', 'sub/c.txt', 'sub/deeper/d.txt' }
+    assert _Names(tree, Path.Scan(str(tree), max_depth=2, workers=workers)) == { 'a.txt', 'b.log', 'sub/c.txt', 'skip/e.txt' }
+    assert _Names(tree, Path.Scan(str(tree), files=False, directories=True, workers=workers)) == { 'sub', 'sub/deeper', 'skip' }
+
+
+def test_walk_yields_paths_and_reports_errors(tree):
+    paths = list(Path.Walk(str(tree), include='*.log'))
+    assert all(isinstance(path, Path) for path in paths) and _Names(tree, paths) == { 'b.log' }
+
+    errors = []
+    assert list(Path.Scan(str(tree / 'missing'), onerror=errors.append)) == []
+    assert isinstance(errors[0], FileNotFoundError)
+
+
+def test_threaded_scan_stops_early(tree):
+    scan = Path.Scan(str(tree), workers=4)
+    assert next(scan)
+    scan.close()
+
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_directory_symlinks_are_directories(tmp_path, workers):
+    (tmp_path / 'real' / 'sub').mkdir(parents=True)
+    (tmp_path / 'real' / 'sub' / 'a.txt').write_bytes(b'a')
+    (tmp_path / 'link').symlink_to(tmp_path / 'real')
+
+    assert _Names(tmp_path, Path.Scan(str(tmp_path), workers=workers)) == { 'real/sub/a.txt' }
+    assert _Names(tmp_path, Path.Scan(str(tmp_path), files=False, directories=True, workers=workers)) == { 'real', 'real/sub', 'link' }
+    assert _Names(tmp_path, Path.Scan(str(tmp_path), follow_symlinks=True, workers=workers)) == { 'real/sub/a.txt', 'link/sub/a.txt' }
+
+    assert [os.path.relpath(str(path), tmp_path) for path, _ in Path.HashMany([str(tmp_path)])] == ['real/sub/a.txt']
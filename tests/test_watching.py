@@ -0,0 +1,75 @@
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+from BaseExtensions.Constants import PlatformIsLinux
+from BaseExtensions.Models import Change, ChangeKind, Path, Snapshot
+
+
+
+
+def test_snapshot_diff(tmp_path):
+    for name in ('kept.txt', 'changed.txt', 'removed.txt', 'moved.txt', 'replaced.txt'): (tmp_path / name).write_text(name)
+    root = Path(str(tmp_path))
+    before = pickle.loads(pickle.dumps(root.Snapshot()))
+
+    (tmp_path / 'changed.txt').write_text('a longer value')
+    (tmp_path / 'removed.txt').unlink()
+    (tmp_path / 'moved.txt').rename(tmp_path / 'renamed.txt')
+    (tmp_path / 'new.txt').write_text('new')
+    (tmp_path / 'replacement').write_text('replaced.txt')
+    os.replace(tmp_path / 'replacement', tmp_path / 'replaced.txt')  # same size, new inode.
+
+    assert list(before.Diff(root.Snapshot())) == [
+            Change(ChangeKind.Moved, str(tmp_path / 'renamed.txt'), str(tmp_path / 'moved.txt')),
+            Change(ChangeKind.Removed, str(tmp_path / 'removed.txt')),
+            Change(ChangeKind.Added, str(tmp_path / 'new.txt')),
+            Change(ChangeKind.Modified, str(tmp_path / 'changed.txt')),
+            Change(ChangeKind.Modified, str(tmp_path / 'replaced.txt')),
+            ]
+
+
+def test_snapshot_of_directories(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    snapshot = Snapshot.Take(str(tmp_path), directories=True)
+    assert 'sub' in snapshot and snapshot['sub'].IsDirectory and len(snapshot) == 1
+
+
+def _Collect(watcher, count: int) -> list:
+    changes, deadline = [], time.monotonic() + 5
+    while len(changes) < count and time.monotonic() < deadline: changes.extend(watcher.Read(0.1))
+    return changes
+
+
+@pytest.mark.skipif(not PlatformIsLinux, reason='inotify is Linux only')
+def test_watch_reports_changes(tmp_path):
+    with Path(str(tmp_path)).Watch(exclude='*.tmp') as watcher:
+        (tmp_path / 'a.txt').write_text('a')
+        (tmp_path / 'ignored.tmp').write_text('x')
+        assert _Collect(watcher, 2) == [Change(ChangeKind.Added, str(tmp_path / 'a.txt')), Change(ChangeKind.Modified, str(tmp_path / 'a.txt'))]
+
+        (tmp_path / 'a.txt').rename(tmp_path / 'b.txt')
+        (tmp_path / 'sub').mkdir()
+        assert _Collect(watcher, 2) == [Change(ChangeKind.Moved, str(tmp_path / 'b.txt'), str(tmp_path / 'a.txt')), Change(ChangeKind.Added, str(tmp_path / 'sub'), None, True)]
+
+        (tmp_path / 'sub' / 'c.txt').write_text('c')  # the new subdirectory is watched too.
+        (tmp_path / 'b.txt').unlink()
+        assert _Collect(watcher, 3) == [
+                Change(ChangeKind.Added, str(tmp_path / 'sub' / 'c.txt')), Change(ChangeKind.Modified, str(tmp_path / 'sub' / 'c.txt')),
+                Change(ChangeKind.Removed, str(tmp_path / 'b.txt')),
+                ]
+
+
+@pytest.mark.skipif(not PlatformIsLinux, reason='inotify is Linux only')
+def test_close_wakes_a_blocked_reader(tmp_path):
+    watcher = Path(str(tmp_path)).Watch()
+    results = []
+    reader = threading.Thread(target=lambda: results.append(list(watcher)))
+    reader.start()
+    time.sleep(0.1)
+    watcher.Close()
+    reader.join(5)
+    assert not reader.is_alive() and results == [[]] and watcher.Closed